@@ -0,0 +1,72 @@
+'''
+Benchmark of the per-call heuristic in PathFinder against the vectorized
+heuristic in VectorizedPathFinder on large grid-like layouts.
+
+Usage:
+
+    python benchmarks/vectorized_heuristic.py [--size 300] [--queries 20]
+'''
+import argparse
+import os
+import random
+import sys
+from time import perf_counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'warehouseroute'))
+
+from graph import Graph, Node, Position  # noqa: E402
+from location import RackLocation  # noqa: E402
+from shortestpath import PathFinder  # noqa: E402
+from vectorsearch import VectorizedPathFinder  # noqa: E402
+
+
+def grid_layout(size: int, seed: int = 1) -> Graph:
+    ''' Grid of size x size locations with costs of 1 to 1.5 per unit '''
+    rng = random.Random(seed)
+    G = Graph()
+    for i in range(size):
+        for j in range(size):
+            G.add_node(Node(i * size + j,
+                            RackLocation('A', str(i), str(j), '1'),
+                            Position(float(i), float(j))))
+    for i in range(size):
+        for j in range(size):
+            node = G.nodes[i * size + j]
+            for di, dj in [(1, 0), (-1, 0), (0, 1), (0, -1)]:
+                if 0 <= i + di < size and 0 <= j + dj < size:
+                    node.add_edge((i + di) * size + j + dj, rng.uniform(1.0, 1.5))
+    return G
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument('--size', type=int, default=300)
+    arg_parser.add_argument('--queries', type=int, default=20)
+    args = arg_parser.parse_args()
+
+    G = grid_layout(args.size)
+    rng = random.Random(2)
+    pairs = [(rng.randrange(G.len()), rng.randrange(G.len()))
+             for _ in range(args.queries)]
+    print('layout {} nodes, {} queries'.format(G.len(), len(pairs)))
+
+    engines = {
+        'per-call heuristic': lambda s, e: PathFinder().shortest_path(G, s, e),
+        'coordinate lists': VectorizedPathFinder(G, precompute=False).shortest_path,
+        'vectorized neighbours': VectorizedPathFinder(
+            G, precompute=False, vector_degree=0).shortest_path,
+        'precomputed heuristic': VectorizedPathFinder(G, precompute=True).shortest_path,
+    }
+    reference = None
+    for name, engine in engines.items():
+        started = perf_counter()
+        costs = [engine(s, e).cost for s, e in pairs]
+        seconds = perf_counter() - started
+        if reference is None:
+            reference = costs
+        assert all(abs(a - b) < 1e-6 for a, b in zip(costs, reference))
+        print('{:<24} {:8.1f} ms/query'.format(name, 1000 * seconds / len(pairs)))
+
+
+if __name__ == '__main__':
+    main()
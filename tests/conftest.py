@@ -42,3 +42,21 @@ def graph1(node1, node2, node3):
     graph.add_node(node2)
     graph.add_node(node3)
     return graph
+
+
+@fixture
+def grid_graph():
+    # 3 x 3 grid where node i * 3 + j is at position (i, j) and is connected
+    # in both directions to its horizontal and vertical neighbours
+    graph = Graph()
+    for i in range(3):
+        for j in range(3):
+            loc = RackLocation("GRID", "1", str(i), str(j))
+            graph.add_node(Node(i * 3 + j, loc, Position(i, j)))
+    for i in range(3):
+        for j in range(3):
+            node = graph.nodes[i * 3 + j]
+            for di, dj in [(1, 0), (-1, 0), (0, 1), (0, -1)]:
+                if 0 <= i + di < 3 and 0 <= j + dj < 3:
+                    node.add_edge((i + di) * 3 + j + dj, 1.0)
+    return graph
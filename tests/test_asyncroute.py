@@ -0,0 +1,63 @@
+import asyncio
+import threading
+from pytest import approx
+from warehouseroute.asyncroute import AsyncPathFinder
+from warehouseroute.shortestpath import PathFinder
+
+
+class BlockingPathFinder(PathFinder):
+    ''' PathFinder that counts its searches and waits for a release event '''
+
+    def __init__(self):
+        super().__init__()
+        self.calls = 0
+        self.release = threading.Event()
+
+    def shortest_path(self, G, start, end):
+        self.calls += 1
+        self.release.wait(5.0)
+        return super().shortest_path(G, start, end)
+
+
+def test_async_shortest_paths(grid_graph):
+
+    finder = AsyncPathFinder(grid_graph)
+
+    async def run():
+        return await finder.shortest_paths([(0, 8), (0, 2), (8, 0)])
+
+    # Test that the batch returns the routes in the order of the pairs
+    routes = asyncio.run(run())
+    assert [r.cost for r in routes] == approx([4.0, 2.0, 4.0])
+
+
+def test_async_merges_identical_requests(grid_graph):
+
+    path_finder = BlockingPathFinder()
+    finder = AsyncPathFinder(grid_graph, path_finder)
+
+    async def run():
+        tasks = [asyncio.create_task(finder.shortest_path(0, 8))
+                 for _ in range(3)]
+        await asyncio.sleep(0.05)
+        path_finder.release.set()
+        return await asyncio.gather(*tasks)
+
+    # Test that the three identical requests are computed once
+    routes = asyncio.run(run())
+    assert path_finder.calls == 1
+    assert all(r.cost == approx(4.0) for r in routes)
+
+
+def test_async_timeout(grid_graph):
+
+    path_finder = BlockingPathFinder()
+    finder = AsyncPathFinder(grid_graph, path_finder)
+
+    async def run():
+        route = await finder.shortest_path(0, 8, timeout=0.01)
+        path_finder.release.set()
+        return route
+
+    # Test that a search that does not finish in time returns None
+    assert asyncio.run(run()) is None
@@ -0,0 +1,49 @@
+import pytest
+from pytest import approx
+from warehouseroute.batching import OrderBatcher
+from warehouseroute.graph import Node, Position
+from warehouseroute.location import RackLocation
+from warehouseroute.shortestpath import PathFinder
+
+
+@pytest.fixture
+def orders():
+    # Two orders in the far column of the grid and two near the depot
+    return {'a': [6, 7], 'b': [8], 'c': [1], 'd': [2, 1]}
+
+
+@pytest.mark.parametrize('method', ['savings', 'seed'])
+def test_batch_orders(grid_graph, orders, method):
+
+    batcher = OrderBatcher(grid_graph, depot=0, max_orders=2)
+    batches = batcher.batch(orders, method=method)
+
+    # Test that every order is in exactly one batch within the capacity and
+    # that the near and far orders are batched together
+    assert sorted(o for b in batches for o in b.orders) == ['a', 'b', 'c', 'd']
+    assert all(len(b.orders) <= 2 for b in batches)
+    assert sorted(sorted(b.orders) for b in batches) == [['a', 'b'], ['c', 'd']]
+
+    # Test that each route is a tour from the depot through the locations
+    po = PathFinder()
+    for batch in batches:
+        route = batch.route
+        assert route.path[0] == 0 and route.path[-1] == 0
+        assert set(n for o in batch.orders for n in orders[o]) <= set(route.path)
+        assert route.cost == approx(po.route_cost(grid_graph, route.path))
+
+
+def test_batch_invalid_method(grid_graph, orders):
+
+    with pytest.raises(ValueError):
+        OrderBatcher(grid_graph, depot=0).batch(orders, method='random')
+
+
+@pytest.mark.parametrize('method', ['savings', 'seed'])
+def test_batch_unreachable_location(grid_graph, orders, method):
+
+    # Test that an order with an isolated pick location is named in the error
+    grid_graph.add_node(Node(9, RackLocation("GRID", "1", "3", "3"), Position(3, 3)))
+    orders['isolated'] = [9]
+    with pytest.raises(ValueError, match='isolated'):
+        OrderBatcher(grid_graph, depot=0).batch(orders, method=method)
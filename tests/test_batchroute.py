@@ -0,0 +1,65 @@
+import io
+import json
+from pytest import approx
+from warehouseroute.batchroute import BatchRouter, main, read_queries
+
+GRAPHFILE = 'examples/warehouse_with_crossaisle.json'
+
+
+def test_route_query():
+
+    router = BatchRouter(GRAPHFILE)
+
+    # Test that a pair given by node ID:s and by location names gets the
+    # same route
+    by_id = router.route_query({'start': 0, 'end': 2})
+    by_name = router.route_query({'start': 'MHA INB1', 'end': 'MHA INB3'})
+    assert by_id['path'] == by_name['path'] == [0, 1, 2]
+    assert by_id['cost'] == approx(2 * 9.090909090909092)
+
+    # Test that a tour visits the stops in order
+    tour = router.route_query({'stops': [0, 2, 1]})
+    assert tour['path'] == [0, 1, 2, 1]
+
+    # Test that invalid queries get an error
+    assert 'error' in router.route_query({'start': 'MHA NOWHERE', 'end': 0})
+    assert 'error' in router.route_query({'stops': []})
+    assert 'error' in router.route_query({'stops': [0]})
+
+
+def test_read_csv_queries():
+
+    queries = list(read_queries(io.StringIO('start,end,stops\n0,2,\n,,0;2;1\n'), 'csv'))
+    assert queries[0]['start'] == '0' and 'stops' not in queries[0]
+    assert queries[1]['stops'] == ['0', '2', '1']
+
+
+def test_main_mixed_csv(tmp_path):
+
+    queryfile = tmp_path / 'queries.csv'
+    outfile = tmp_path / 'routes.jsonl'
+    queryfile.write_text('start,end,stops\n0,2,\n,,0;2;1\n')
+
+    main([GRAPHFILE, str(queryfile), '-o', str(outfile)])
+
+    # Test that pairs and tours in the same file are both routed
+    results = [json.loads(line) for line in outfile.read_text().splitlines()]
+    assert results[0]['path'] == [0, 1, 2]
+    assert results[0]['cost'] == approx(2 * 9.090909090909092)
+    assert results[1]['path'] == [0, 1, 2, 1]
+
+
+def test_main_parallel(tmp_path):
+
+    queryfile = tmp_path / 'queries.jsonl'
+    outfile = tmp_path / 'routes.jsonl'
+    queries = [{'start': i, 'end': 129 - i} for i in range(20)]
+    queryfile.write_text('\n'.join(json.dumps(q) for q in queries))
+
+    main([GRAPHFILE, str(queryfile), '-o', str(outfile), '-w', '2'])
+
+    # Test that all routes are written in the order of the queries
+    results = [json.loads(line) for line in outfile.read_text().splitlines()]
+    assert [r['start'] for r in results] == list(range(20))
+    assert all(r['path'][0] == r['start'] and r['path'][-1] == r['end']
+               for r in results)
@@ -0,0 +1,53 @@
+from pytest import approx
+from warehouseroute.distancestore import DistanceStore
+from warehouseroute.shortestpath import PathFinder, Route
+
+
+def test_distance_store_roundtrip(tmp_path, grid_graph):
+
+    filename = str(tmp_path / 'routes.db')
+    po = PathFinder()
+    route = po.shortest_path(grid_graph, 0, 8)
+
+    # Test that a stored route can be read back by another store instance
+    with DistanceStore(filename, grid_graph, batch_size=10) as store:
+        store.put(0, 8, route)
+        assert store.get(0, 8).path == route.path
+    with DistanceStore(filename, grid_graph) as store:
+        stored = store.get(0, 8)
+        assert stored.path == route.path
+        assert stored.cost == approx(route.cost)
+        assert store.get(8, 0) is None
+
+    # Test that routes are not returned when the graph has changed
+    grid_graph.nodes[0].edges[0].cost = 2.0
+    with DistanceStore(filename, grid_graph) as store:
+        assert store.get(0, 8) is None
+        assert store.purge_stale() == 1
+
+
+def test_path_finder_uses_store(tmp_path, grid_graph):
+
+    with DistanceStore(str(tmp_path / 'routes.db'), grid_graph) as store:
+        po = PathFinder(store)
+
+        # Test that the route found by the search is added to the store
+        route = po.shortest_path(grid_graph, 0, 8)
+        assert store.get(0, 8).path == route.path
+
+        # Test that the stored route is returned and respects max_cost
+        store.put(0, 8, Route(route.path, 3.5))
+        assert po.shortest_path(grid_graph, 0, 8).cost == approx(3.5)
+        assert po.shortest_path(grid_graph, 0, 8, max_cost=3.0) is None
+
+
+def test_store_follows_graph_changes(tmp_path, grid_graph):
+
+    po = PathFinder(DistanceStore(str(tmp_path / 'routes.db'), grid_graph))
+    assert po.shortest_path(grid_graph, 0, 2).cost == approx(2.0)
+
+    # Test that the stored route is not returned after an edge cost change
+    grid_graph.set_edge_cost(0, 1, 5.0)
+    assert po.shortest_path(grid_graph, 0, 2).cost == approx(4.0)
+    assert po.store.graph_hash == grid_graph.content_hash()
+    po.store.close()
@@ -1,4 +1,4 @@
-from pytest import approx
+from pytest import approx, raises
 from warehouseroute.graph import Graph, Node, Position
 from warehouseroute.location import AreaLocation, RackLocation
 
@@ -72,3 +72,43 @@ def test_get_node_id_for_location(loc1, node1, loc3, node3, graph1):
     # Test that method returns the correct node for an AreaLocation
     nodeid3 = graph1.get_node_id_for_location(loc3)
     assert nodeid3 == node3.id
+
+
+def test_multi_floor_heuristic():
+
+    # Two nodes above each other on different floors, connected by a lift
+    # edge with cost 5, and a node next to the lift on the upper floor
+    graph = Graph()
+    ground = Node(0, AreaLocation("LIFT0"), Position(0.0, 0.0))
+    upper = Node(1, AreaLocation("LIFT1"), Position(0.0, 0.0, floor=1))
+    rack = Node(2, RackLocation("MEZZ", "1", "1", "1"), Position(3.0, 4.0, floor=1))
+    ground.add_edge(1, 5.0, connector='lift')
+    upper.add_edge(2, 5.0)
+    for node in [ground, upper, rack]:
+        graph.add_node(node)
+
+    # Test that the heuristic on a floor is the Euclidean distance and that
+    # changing floors adds the connector cost
+    assert graph.floors() == [0, 1]
+    assert graph.heuristic(1, 2) == approx(5.0)
+    assert graph.heuristic(0, 1) == approx(5.0)
+    assert graph.heuristic(0, 2) == approx(10.0)
+
+    # Test that the connector cost follows the cost of the lift edge
+    graph.set_edge_cost(0, 1, 7.0)
+    assert graph.heuristic(0, 2) == approx(12.0)
+
+
+def test_set_edge_cost(grid_graph):
+
+    # Test that the edge cost is changed and the old cost returned
+    assert grid_graph.set_edge_cost(0, 1, 3.0) == 1.0
+    assert grid_graph.cost(0, 1) == 3.0
+    assert grid_graph.cost(1, 0) == 1.0
+    with raises(ValueError):
+        grid_graph.set_edge_cost(0, 8, 1.0)
+
+    # Test that the revision is incremented
+    revision = grid_graph.revision
+    grid_graph.set_edge_cost(0, 1, float('inf'))
+    assert grid_graph.revision == revision + 1
@@ -0,0 +1,75 @@
+from copy import deepcopy
+from warehouseroute.graph import Node, Position
+from warehouseroute.layoutdiff import diff_graphs
+from warehouseroute.location import RackLocation
+from warehouseroute.pathtree import TreeCache
+
+
+def renumbered(G, offset):
+    ''' Copy of a graph with all node ID:s shifted by offset '''
+    new = deepcopy(G)
+    nodes = list(new.nodes.values())
+    new.nodes = {}
+    for node in nodes:
+        node.id += offset
+        for edge in node.edges:
+            edge.to_node += offset
+        new.add_node(node)
+    return new
+
+
+def test_diff_identical(grid_graph):
+
+    # Test that a renumbered copy only differs by its node ID:s
+    diff = diff_graphs(grid_graph, renumbered(grid_graph, 100))
+    assert diff.node_map == {n: n + 100 for n in grid_graph.nodes}
+    assert diff.renumbered() and not diff.edges_changed()
+    assert diff_graphs(grid_graph, deepcopy(grid_graph)).is_empty()
+
+
+def test_diff_changes(grid_graph):
+
+    new = renumbered(grid_graph, 100)
+    new.nodes[100].position = Position(-1, 0)
+    new.set_edge_cost(101, 102, 3.0)
+    new.nodes[104].edges = [e for e in new.nodes[104].edges if e.to_node != 105]
+    del new.nodes[108]
+    for node in new.nodes.values():
+        node.edges = [e for e in node.edges if e.to_node != 108]
+    new.add_node(Node(109, RackLocation("GRID", "1", "3", "0"), Position(3, 0)))
+    new.nodes[109].add_edge(106, 1.0)
+    new.nodes[106].add_edge(109, 1.0)
+
+    diff = diff_graphs(grid_graph, new)
+    assert diff.added == [109] and diff.removed == [8] and diff.moved == [100]
+    assert [(f, t) for f, t, _, _ in diff.changed_edges] == [(101, 102)]
+    assert sorted((f, t) for f, t, _ in diff.removed_edges) == [(4, 5), (5, 8), (7, 8), (8, 5), (8, 7)]
+    assert sorted((f, t) for f, t, _ in diff.added_edges) == [(106, 109), (109, 106)]
+    assert diff.costs_decreased()
+    assert str(diff) == 'nodes added 1 removed 1 moved 1 renumbered 8 ' \
+        'edges added 2 removed 5 changed 1'
+
+
+def test_diff_affects_tree(grid_graph):
+
+    trees = TreeCache(grid_graph)
+    forward = trees.build(0)
+    reverse = trees.build(0, reverse=True)
+
+    # Test that a more expensive edge into the root only affects the
+    # reverse tree
+    new = deepcopy(grid_graph)
+    new.set_edge_cost(1, 0, 5.0)
+    diff = diff_graphs(grid_graph, new)
+    assert not diff.affects_tree(forward)
+    assert diff.affects_tree(reverse)
+
+    # Test that a shortcut and a more expensive tree edge affect the trees
+    new = deepcopy(grid_graph)
+    new.nodes[0].add_edge(8, 1.0)
+    assert diff_graphs(grid_graph, new).affects_tree(forward)
+    assert not diff_graphs(grid_graph, new).affects_tree(reverse)
+    new = deepcopy(grid_graph)
+    node, parent = next((n, p) for n, p in reverse.pred.items() if p is not None)
+    new.set_edge_cost(node, parent, 5.0)
+    assert diff_graphs(grid_graph, new).affects_tree(reverse)
@@ -0,0 +1,122 @@
+import gc
+import sqlite3
+from copy import deepcopy
+from pytest import approx, raises
+from warehouseroute.distancestore import DistanceStore
+from warehouseroute.graph import Edge, Graph, Node
+from warehouseroute.livegraph import LiveGraph
+from warehouseroute.pathtree import TreeCache
+from warehouseroute.preprocessing import PreprocessingPipeline, load_artifacts
+from warehouseroute.profiles import RoutingProfile, VehicleClass
+
+
+def test_swap_keeps_unaffected_caches(tmp_path, grid_graph):
+
+    trees = TreeCache(grid_graph)
+    trees.build(0)
+    trees.build(0, reverse=True)
+    store = DistanceStore(str(tmp_path / 'routes.db'), grid_graph)
+    profile = RoutingProfile('picker', VehicleClass.PICKER)
+    profile.components(grid_graph)
+    live = LiveGraph(grid_graph, trees, store, [profile])
+    route_26 = live.shortest_path(2, 6)
+    route_85 = live.shortest_path(8, 5)
+    store.flush()
+
+    # Test that a query running on the old revision is not affected
+    old, old_finder = live.snapshot()
+    new = deepcopy(grid_graph)
+    new.set_edge_cost(1, 0, 5.0)
+    diff = live.swap(new)
+    assert live.version == 1 and live.G is new
+    assert old_finder.shortest_path(old, 1, 0).cost == approx(1.0)
+
+    # Test that the forward tree is moved, and the reverse tree into node 0,
+    # which used the edge, is built again
+    new_trees = live.path_finder.trees
+    assert new_trees.get(0).dist == trees.get(0).dist
+    assert new_trees.get(0, reverse=True).dist[1] == approx(3.0)
+    assert live.shortest_path(1, 0).cost == approx(3.0)
+
+    # Test that only stored routes without the changed edge are kept
+    new_store = live.path_finder.store
+    uses_edge = (1, 0) in zip(route_26.path, route_26.path[1:])
+    assert (new_store.get(2, 6) is None) == uses_edge
+    assert new_store.get(8, 5).path == route_85.path
+    assert profile.cache(new)['components'] == profile.components(grid_graph)
+    assert str(diff).endswith('changed 1')
+    live.close()
+
+
+def test_swap_refreshes_artifacts(tmp_path, grid_graph):
+
+    PreprocessingPipeline(grid_graph, str(tmp_path), workers=1).run(
+        landmarks=2, sources=[0, 8])
+    live = LiveGraph(grid_graph, artifacts_dir=str(tmp_path), workers=1)
+
+    # Test that moving a node only writes the arrays again
+    new = deepcopy(grid_graph)
+    new.nodes[4].position.x = 1.5
+    live.swap(new)
+    artifacts = load_artifacts(str(tmp_path), new)
+    assert set(artifacts) == {'arrays', 'components', 'landmarks', 'distances'}
+    assert artifacts['arrays']['x'][4] == approx(1.5)
+
+    # Test that a cheaper edge updates the distances
+    newer = deepcopy(new)
+    newer.set_edge_cost(0, 1, 0.5)
+    live.swap(newer)
+    artifacts = load_artifacts(str(tmp_path), newer)
+    assert artifacts['distances']['distances'][0, 1] == approx(3.5)
+
+
+def test_swap_closes_retired_stores(tmp_path, grid_graph):
+
+    store = DistanceStore(str(tmp_path / 'routes.db'), grid_graph)
+    live = LiveGraph(grid_graph, store=store)
+    old, old_finder = live.snapshot()
+    new = deepcopy(grid_graph)
+    new.set_edge_cost(1, 0, 5.0)
+    live.swap(new)
+
+    # Test that the old store stays open while a snapshot references it,
+    # and is closed when the snapshot is released
+    assert old_finder.shortest_path(old, 1, 0).cost == approx(1.0)
+    store.purge_stale()
+    del old_finder
+    gc.collect()
+    with raises(sqlite3.ProgrammingError):
+        store.purge_stale()
+    assert live.shortest_path(1, 0).cost == approx(3.0)
+    live.close()
+
+
+def test_swap_remaps_profile_multipliers(grid_graph):
+
+    profile = RoutingProfile('picker', VehicleClass.PICKER, edge_multipliers={
+        (0, 1): 5.0, (1, 2): 5.0, (7, 8): 0.5})
+    live = LiveGraph(grid_graph, profiles=[profile])
+    old, old_finder = live.snapshot()
+    assert old_finder.shortest_path(old, 0, 2, profile=profile).cost == approx(4.0)
+
+    # New revision with every node ID shifted by 10 and node 8 removed
+    new = Graph()
+    for nodeid, node in grid_graph.nodes.items():
+        if nodeid != 8:
+            new.add_node(Node(nodeid + 10, node.location, node.position))
+    for nodeid, node in grid_graph.nodes.items():
+        for edge in node.edges:
+            if 8 not in (nodeid, edge.to_node):
+                new.add_edge(nodeid + 10, edge.to_node + 10, edge.cost)
+    live.swap(new)
+
+    # Test that a query running on the old revision keeps the old multipliers
+    route = old_finder.shortest_path(old, 0, 2, profile=profile)
+    assert route.path == [0, 3, 4, 5, 2] and route.cost == approx(4.0)
+    assert profile.edge_cost(0, Edge(1, 1.0), old) == approx(5.0)
+
+    # Test that the multipliers follow the locations, and the multiplier of
+    # the removed node is dropped
+    route = live.shortest_path(10, 12, profile=profile)
+    assert route.path == [10, 13, 14, 15, 12] and route.cost == approx(4.0)
+    assert profile.edge_multipliers(new) == {(10, 11): 5.0, (11, 12): 5.0}
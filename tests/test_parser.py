@@ -17,6 +17,29 @@ def test_parse_graph_json_file(graph_json):
     assert graph.len() == 2
 
 
+def test_parse_multi_floor_graph():
+
+    parser = GraphParser()
+    graph_json = '''[
+      {"id": 0, "position": {"x": 1.0, "y": 2.0},
+       "location": {"locationType": 2, "mha": "LIFT0"},
+       "adjacencies": [{"nodeTo": 1, "cost": 4.0, "connector": "lift", "waitTime": 30.0}]},
+      {"id": 1, "position": {"x": 1.0, "y": 2.0, "floor": 1},
+       "location": {"locationType": 2, "mha": "LIFT1"},
+       "adjacencies": [{"nodeTo": 0, "cost": 4.0, "connector": "lift", "waitTime": 30.0}]}
+    ]'''
+    mock_open = mock.mock_open(read_data=graph_json)
+    with mock.patch('builtins.open', mock_open):
+      graph = parser.parse_json('filename')
+
+    # Test that the floors are parsed and the waiting time is added to the
+    # connector cost
+    assert graph.floors() == [0, 1]
+    edge = graph.nodes[0].edges[0]
+    assert edge.connector == 'lift'
+    assert edge.cost == 34.0
+
+
 @pytest.fixture
 def graph_json() -> str:
   return '''[
@@ -61,3 +84,22 @@ def graph_json() -> str:
     ]
   }
   ]'''
+
+
+def test_parse_graph_json_validation(graph_json, caplog):
+
+    parser = GraphParser()
+    mock_open = mock.mock_open(read_data=graph_json)
+
+    # Test that the dangling edges to node 2 are reported, logged and dropped
+    with mock.patch('builtins.open', mock_open):
+      graph = parser.parse_json('filename')
+    assert parser.report.dangling_edges == [(0, 2), (1, 2)]
+    assert graph.weak_components is not None
+    assert 'dangling edges' in caplog.text
+    assert all(e.to_node != 2 for n in graph.nodes.values() for e in n.edges)
+
+    # Test that strict parsing rejects the graph
+    with mock.patch('builtins.open', mock_open):
+      with pytest.raises(ValueError):
+        parser.parse_json('filename', strict=True)
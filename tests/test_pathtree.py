@@ -0,0 +1,70 @@
+from pytest import approx
+from warehouseroute.pathtree import TreeCache
+from warehouseroute.shortestpath import PathFinder
+
+
+def test_tree_routes(grid_graph):
+
+    trees = TreeCache(grid_graph)
+
+    # Test that forward and reverse trees give the same routes as A*
+    forward = trees.build(0)
+    reverse = trees.build(8, reverse=True)
+    po = PathFinder()
+    for node in grid_graph.nodes:
+        assert forward.route(node).cost == approx(po.shortest_path(grid_graph, 0, node).cost)
+        route = reverse.route(node)
+        assert route.path[0] == node and route.path[-1] == 8
+        assert route.cost == approx(po.shortest_path(grid_graph, node, 8).cost)
+
+    # Test that the arrays point to the parents
+    node_ids, dist, pred = forward.arrays()
+    assert pred[node_ids.index(0)] == -1
+    assert dist[node_ids.index(8)] == approx(4.0)
+
+
+def test_tree_cache_budget(grid_graph):
+
+    tree_size = TreeCache(grid_graph).build(0).nbytes()
+    trees = TreeCache(grid_graph, memory_budget=2 * tree_size)
+
+    # Test that the least recently used tree is evicted
+    trees.build(0)
+    trees.build(1)
+    trees.get(0)
+    trees.build(2)
+    assert len(trees) == 2
+    assert trees.get(1) is None
+    assert trees.get(0) is not None
+    assert trees.nbytes <= trees.memory_budget
+
+
+def test_path_finder_uses_trees(grid_graph):
+
+    trees = TreeCache(grid_graph)
+    trees.build(4)
+    po = PathFinder(trees=trees)
+
+    # Test that queries from the root are answered by the tree
+    assert po.shortest_path(grid_graph, 4, 0).cost == approx(2.0)
+    assert po.shortest_path(grid_graph, 4, 0, max_cost=1.0) is None
+    assert po.shortest_path(grid_graph, 0, 4).cost == approx(2.0)
+
+    # Test that the tree is used instead of searching, so a cost change is
+    # only seen after the tree is rebuilt
+    for edge in grid_graph.nodes[4].edges:
+        edge.cost = 10.0
+    assert po.shortest_path(grid_graph, 4, 0).cost == approx(2.0)
+    trees.build(4)
+    assert po.shortest_path(grid_graph, 4, 0).cost == approx(11.0)
+
+
+def test_tree_cache_graph_changes(grid_graph):
+
+    trees = TreeCache(grid_graph)
+    trees.build(0)
+
+    # Test that the trees are dropped when the graph changes
+    grid_graph.set_edge_cost(0, 1, 5.0)
+    assert trees.get(0) is None
+    assert len(trees) == 0 and trees.nbytes == 0
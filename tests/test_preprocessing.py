@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+from pytest import approx
+from warehouseroute.grapharrays import GraphArrays
+from warehouseroute.preprocessing import PreprocessingPipeline, load_artifacts
+from warehouseroute.shortestpath import PathFinder
+
+
+def test_graph_arrays(grid_graph):
+
+    arrays = GraphArrays.from_graph(grid_graph)
+
+    # Test that the CSR arrays hold the edges of every node
+    assert len(arrays) == 9
+    assert arrays.indptr[-1] == sum(len(n.edges) for n in grid_graph.nodes.values())
+    i = arrays.index[4]
+    neighbors = arrays.node_ids[arrays.indices[arrays.indptr[i]:arrays.indptr[i + 1]]]
+    assert sorted(neighbors) == sorted(grid_graph.neighbors(4))
+
+    # Test that the shared memory copy has the same content
+    shared = GraphArrays.attach(arrays.to_shared())
+    assert np.array_equal(shared.costs, arrays.costs)
+    assert shared.dijkstra(arrays.index[0])[arrays.index[8]] == approx(4.0)
+    shared.release()
+    arrays.release(unlink=True)
+
+
+def test_pipeline(tmp_path, grid_graph):
+
+    # Remove the edges of node 8 so that it is only reachable one way
+    grid_graph.nodes[8].edges = []
+    pipeline = PreprocessingPipeline(grid_graph, str(tmp_path), workers=2)
+    reports = pipeline.run(landmarks=2, sources=[0, 8])
+    assert [r.name for r in reports] == ['arrays', 'components', 'landmarks', 'distances']
+    assert all(r.seconds >= 0 for r in reports)
+
+    artifacts = load_artifacts(str(tmp_path), grid_graph)
+    assert set(artifacts['components']['components']) == {0}
+    assert artifacts['landmarks']['from_landmark'].shape == (2, 9)
+    distances = artifacts['distances']['distances']
+    assert distances[0, 1] == approx(4.0)
+    assert distances[1, 0] == np.inf
+
+    # Test that the landmark distances are exact
+    po = PathFinder()
+    landmark = int(artifacts['landmarks']['landmarks'][0])
+    to_landmark = artifacts['landmarks']['to_landmark'][0]
+    route = po.shortest_path(grid_graph, 0, landmark)
+    assert to_landmark[0] == approx(route.cost)
+
+    # Test that artifacts of another graph are rejected
+    grid_graph.nodes[0].edges[0].cost = 5.0
+    with pytest.raises(ValueError):
+        load_artifacts(str(tmp_path), grid_graph)
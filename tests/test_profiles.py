@@ -0,0 +1,49 @@
+from pytest import approx
+from warehouseroute.location import DeepStackingLocation
+from warehouseroute.profiles import RoutingProfile, VehicleClass, restrict_edges
+from warehouseroute.shortestpath import PathFinder
+
+
+def test_restrict_edges(grid_graph):
+
+    # Turn node 1 into a deep stacking lane that reach trucks may not enter
+    grid_graph.nodes[1].location = DeepStackingLocation("DS1", "1", "1")
+    count = restrict_edges(
+        grid_graph, VehicleClass.REACH_TRUCK,
+        lambda _, edge: isinstance(grid_graph.nodes[edge.to_node].location,
+                                   DeepStackingLocation))
+    assert count == 3
+    for edge in grid_graph.nodes[0].edges:
+        if edge.to_node == 1:
+            assert not edge.access & VehicleClass.REACH_TRUCK
+            assert edge.access & VehicleClass.PICKER
+
+
+def test_profile_shortest_path(grid_graph):
+
+    po = PathFinder()
+    truck = RoutingProfile('reach truck', VehicleClass.REACH_TRUCK, 2.0)
+    picker = RoutingProfile('picker', VehicleClass.PICKER)
+    restrict_edges(grid_graph, VehicleClass.REACH_TRUCK,
+                   lambda _, edge: edge.to_node == 1)
+
+    # Test that the truck avoids node 1 and that its costs are scaled
+    route = po.shortest_path(grid_graph, 0, 2, profile=truck)
+    assert 1 not in route.path
+    assert route.cost == approx(8.0)
+
+    # Test that the picker uses the same graph without the restriction
+    assert po.shortest_path(grid_graph, 0, 2, profile=picker).path == [0, 1, 2]
+
+    # Test that a node without usable edges into it is unreachable for the
+    # truck
+    assert po.shortest_path(grid_graph, 0, 1, profile=truck) is None
+
+    # Test that the components are rebuilt after the masks change
+    components = truck.components(grid_graph)
+    assert components[1] == components[0]
+    restrict_edges(grid_graph, VehicleClass.REACH_TRUCK,
+                   lambda nodeid, _: nodeid == 1)
+    truck.invalidate(grid_graph)
+    components = truck.components(grid_graph)
+    assert components[1] != components[0]
@@ -0,0 +1,55 @@
+from warehouseroute.parser import GraphParser
+from warehouseroute.replay import RecordingPathFinder, main, percentile, replay
+from warehouseroute.shortestpath import PathFinder, Route
+
+GRAPHFILE = 'examples/warehouse_with_crossaisle.json'
+
+
+def test_percentile():
+    assert percentile([3.0, 1.0, 2.0, 4.0], 50) == 2.0
+    assert percentile([3.0, 1.0, 2.0, 4.0], 100) == 4.0
+
+
+def test_record_and_replay(tmp_path, grid_graph):
+
+    filename = str(tmp_path / 'queries.jsonl.gz')
+    with RecordingPathFinder(filename) as po:
+        po.shortest_path(grid_graph, 0, 8)
+        po.shortest_path(grid_graph, 2, 6)
+        # Queries with early termination options are not recorded
+        po.shortest_path(grid_graph, 0, 8, weight=2.0)
+
+    # Test that the same engine reproduces the recorded costs
+    report = replay(filename, grid_graph,
+                    lambda G, s, e: PathFinder().shortest_path(G, s, e))
+    assert report.queries == 2
+    assert report.cost_mismatches == []
+    assert len(report.replayed_seconds) == 2
+
+    # Test that an engine with wrong costs is reported
+    report = replay(filename, grid_graph, lambda G, s, e: Route([s, e], 1.0))
+    assert len(report.cost_mismatches) == 2
+    assert report.cost_mismatches[0]['replayed_cost'] == 1.0
+
+
+def test_replay_gate(tmp_path):
+
+    filename = str(tmp_path / 'queries.jsonl.gz')
+    G = GraphParser().parse_json(GRAPHFILE)
+    with RecordingPathFinder(filename) as po:
+        for end in range(0, 130, 13):
+            po.shortest_path(G, 0, end)
+
+    # Test that the gate passes for the exact engines
+    for engine in ['astar', 'vectorized', 'trees', 'store']:
+        assert main([GRAPHFILE, filename, '-e', engine, '--max-mismatches', '0']) == 0
+
+    # Test that the gate fails for an engine with wrong costs given as
+    # module:callable
+    assert main([GRAPHFILE, filename, '-e', 'test_replay:wrong_engine',
+                 '--max-mismatches', '0']) == 1
+
+
+def wrong_engine(G, start, end):
+    ''' Engine that always returns a direct route of cost 1 '''
+    return Route([start, end], 1.0)
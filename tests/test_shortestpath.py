@@ -1,5 +1,8 @@
 from pytest import approx
+from warehouseroute.graph import Node, Position
+from warehouseroute.location import RackLocation
 from warehouseroute.shortestpath import PathFinder
+from warehouseroute.validation import GraphValidator
 
 
 def test_shortest_path(graph1, loc1, loc3):
@@ -19,3 +22,113 @@ def test_shortest_path(graph1, loc1, loc3):
     # Test that shortest_path returns None if there is no path
     route = po.shortest_path(graph1, node3, node1)
     assert route == None
+
+
+def test_shortest_path_tree(graph1, node1, node2, node3):
+
+    po = PathFinder()
+
+    # Forward tree holds the cost from the root and the previous node
+    dist, pred = po.shortest_path_tree(graph1, node1.id)
+    assert dist == {node1.id: 0.0, node2.id: 1.0, node3.id: 2.0}
+    assert pred[node3.id] == node1.id
+
+    # Reverse tree holds the cost to the root and the next node towards it
+    dist, succ = po.shortest_path_tree(graph1, node3.id, reverse=True)
+    assert dist[node2.id] == approx(3.0)
+    assert succ[node1.id] == node3.id
+
+
+def test_k_shortest_paths(grid_graph):
+
+    po = PathFinder()
+
+    # There are 6 shortest paths of cost 4 across the grid and the next ones
+    # have cost 6
+    routes = po.k_shortest_paths(grid_graph, 0, 8, 8)
+    assert len(routes) == 8
+    assert [r.cost for r in routes] == approx([4.0] * 6 + [6.0] * 2)
+    assert len({tuple(r.path) for r in routes}) == 8
+    for route in routes:
+        assert route.path[0] == 0 and route.path[-1] == 8
+        assert len(set(route.path)) == len(route.path)
+        assert po.route_cost(grid_graph, route.path) == approx(route.cost)
+
+    # There is no path from a node without edges
+    grid_graph.nodes[0].edges = []
+    assert po.k_shortest_paths(grid_graph, 0, 8, 3) == []
+
+
+def test_alternative_routes(grid_graph):
+
+    po = PathFinder()
+
+    routes = po.alternative_routes(grid_graph, 0, 2, k=2, max_overlap=0.0)
+    assert len(routes) == 2
+    assert routes[0].path == [0, 1, 2]
+    # The alternative shares no edge with the shortest route
+    assert not set(zip(routes[1].path, routes[1].path[1:])) & {(0, 1), (1, 2)}
+    assert routes[1].cost == approx(po.route_cost(grid_graph, routes[1].path))
+
+
+def test_shortest_path_early_termination(grid_graph):
+
+    po = PathFinder()
+
+    # Test that the route is found when it is within the maximum cost
+    route = po.shortest_path(grid_graph, 0, 8, max_cost=4.0)
+    assert route.cost == approx(4.0)
+
+    # Test that no route is returned beyond the maximum cost or budget
+    assert po.shortest_path(grid_graph, 0, 8, max_cost=3.9) is None
+    assert po.shortest_path(grid_graph, 0, 8, max_expansions=2) is None
+    assert po.within_cost(grid_graph, 0, 8, 4.0)
+    assert not po.within_cost(grid_graph, 0, 8, 2.0)
+
+    # Test that weighted A* stays within its suboptimality bound
+    route = po.shortest_path(grid_graph, 0, 8, weight=2.0)
+    assert route.cost <= 2.0 * 4.0
+
+
+def test_anytime_paths(grid_graph):
+
+    po = PathFinder()
+
+    results = list(po.anytime_paths(grid_graph, 0, 8))
+    bounds = [bound for _, bound in results]
+    assert bounds == sorted(bounds, reverse=True)
+    assert bounds[-1] == 1.0
+    assert results[-1][0].cost == approx(4.0)
+    for route, bound in results:
+        assert route.cost <= bound * 4.0
+
+
+def test_shortest_path_after_graph_change(grid_graph):
+
+    GraphValidator().validate(grid_graph)
+    po = PathFinder()
+
+    # Test that a node added after the validation can be routed to
+    grid_graph.add_node(Node(9, RackLocation("GRID", "1", "3", "0"), Position(3, 0)))
+    grid_graph.add_edge(9, 6, 1.0)
+    grid_graph.add_edge(6, 9, 1.0)
+    assert grid_graph.weak_components is None
+    assert po.shortest_path(grid_graph, 0, 9).cost == approx(3.0)
+
+    # Test that nodes missing from stale components are not rejected
+    GraphValidator().validate(grid_graph)
+    grid_graph.nodes[9].add_edge(10, 1.0)
+    grid_graph.nodes[10] = Node(10, RackLocation("GRID", "1", "4", "0"), Position(4, 0))
+    assert po.shortest_path(grid_graph, 0, 10).cost == approx(4.0)
+
+
+def test_shortest_path_blocked_edges(grid_graph):
+
+    po = PathFinder()
+
+    # Test that edges with infinite cost are not used
+    for nodeid in [5, 7]:
+        grid_graph.set_edge_cost(nodeid, 8, float('inf'))
+    assert po.shortest_path(grid_graph, 0, 8) is None
+    dist, _ = po.shortest_path_tree(grid_graph, 8, reverse=True)
+    assert list(dist) == [8]
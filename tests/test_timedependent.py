@@ -0,0 +1,42 @@
+import pytest
+from pytest import approx
+from warehouseroute.shortestpath import PathFinder
+from warehouseroute.timedependent import CostProfile, TimeDependentCosts
+
+
+def test_cost_profile_interpolation():
+
+    profile = CostProfile([0.0, 100.0], [1.0, 3.0], period=200.0)
+
+    # Test interpolation between breakpoints and across the period end
+    assert profile.factor(50.0) == approx(2.0)
+    assert profile.factor(150.0) == approx(2.0)
+    assert profile.factor(250.0) == approx(2.0)
+    assert profile.min_factor == 1.0
+
+    with pytest.raises(ValueError):
+        CostProfile([10.0, 5.0], [1.0, 1.0])
+
+
+def test_time_dependent_path(grid_graph):
+
+    po = PathFinder()
+    costs = TimeDependentCosts(speed=0.5)
+
+    # Without profiles, the travel time is the cost divided by the speed
+    route = po.time_dependent_path(grid_graph, 0, 2, 0.0, costs)
+    assert route.path == [0, 1, 2]
+    assert route.cost == approx(4.0)
+
+    # Congestion on the direct aisle makes the detour faster
+    costs.set_congestion(0, 1, 10.0)
+    route = po.time_dependent_path(grid_graph, 0, 2, 0.0, costs)
+    assert route.path == [0, 3, 4, 1, 2]
+    assert route.cost == approx(8.0)
+
+    # A profile that is only congested at night does not affect day trips
+    costs.set_congestion(0, 1, 1.0)
+    night = CostProfile([0.0, 1000.0, 2000.0], [10.0, 1.0, 10.0], period=3000.0)
+    costs.set_profile(0, 1, night)
+    assert po.time_dependent_path(grid_graph, 0, 2, 1000.0, costs).cost == approx(4.0)
+    assert po.time_dependent_path(grid_graph, 0, 2, 0.0, costs).cost == approx(8.0)
@@ -0,0 +1,83 @@
+import random
+from pytest import approx
+from warehouseroute.graph import Position
+from warehouseroute.pathtree import TreeCache
+from warehouseroute.shortestpath import PathFinder
+from warehouseroute.tracking import RouteTracker
+
+
+def test_tracker_on_route(grid_graph):
+
+    route = PathFinder().shortest_path(grid_graph, 0, 8)
+    tracker = RouteTracker(grid_graph, route, tolerance=0.2)
+    assert tracker.snap(Position(1.9, 1.1)) == 7
+
+    # Test that positions along the route keep the route
+    a = grid_graph.nodes[route.path[1]].position
+    b = grid_graph.nodes[route.path[2]].position
+    assert tracker.update(Position((a.x + b.x) / 2 + 0.1, (a.y + b.y) / 2))
+    assert tracker.route is route
+    assert tracker.progress == 1
+    assert tracker.remaining().cost == approx(3.0)
+    assert tracker.replans == 0
+
+
+def test_tracker_deviation(grid_graph):
+
+    route_nodes = [0, 1, 2, 5, 8]
+    route = PathFinder().shortest_path(grid_graph, 0, 8)
+    route.path = route_nodes
+    tracker = RouteTracker(grid_graph, route, tolerance=0.2)
+
+    # Test that a position off the route gives a new route from the
+    # closest node
+    assert not tracker.update(Position(1.1, 0.0))
+    assert tracker.replans == 1
+    assert tracker.route.path[0] == 3
+    assert tracker.route.path[-1] == 8
+    assert tracker.route.cost == approx(3.0)
+
+
+def test_tracker_edge_costs(grid_graph):
+
+    route = PathFinder().shortest_path(grid_graph, 0, 8)
+    tracker = RouteTracker(grid_graph, route, trees=TreeCache(grid_graph))
+
+    # Test that blocking an edge of the route replaces the route
+    a, b = route.path[0], route.path[1]
+    tracker.set_edge_cost(a, b, float('inf'))
+    assert tracker.route.path[1] != b
+    assert tracker.route.cost == approx(4.0)
+
+    # Test that the repaired tree matches a new tree after random changes
+    rng = random.Random(3)
+    edges = [(n, e.to_node) for n, node in grid_graph.nodes.items() for e in node.edges]
+    for _ in range(50):
+        tracker.set_edge_cost(*rng.choice(edges), rng.choice([0.5, 1.0, 2.0, 5.0, float('inf')]))
+        dist, _ = PathFinder().shortest_path_tree(grid_graph, 8, reverse=True)
+        reachable = {n: d for n, d in dist.items() if d < float('inf')}
+        assert tracker.tree.dist.keys() >= reachable.keys()
+        for nodeid, cost in tracker.tree.dist.items():
+            assert cost == approx(dist.get(nodeid, float('inf')))
+        for nodeid in reachable:
+            assert tracker.tree.route(nodeid).cost == approx(dist[nodeid])
+
+
+def test_tracker_goal_blocked(grid_graph):
+
+    route = PathFinder().shortest_path(grid_graph, 0, 8)
+    tracker = RouteTracker(grid_graph, route, tolerance=0.2)
+
+    # Test that the route is dropped when every edge into the goal is blocked
+    tracker.set_edge_cost(5, 8, float('inf'))
+    tracker.set_edge_cost(7, 8, float('inf'))
+    assert tracker.route is None
+    assert tracker.remaining() is None
+    start = grid_graph.nodes[0].position
+    assert not tracker.update(Position(start.x, start.y))
+    assert tracker.route is None
+
+    # Test that the route comes back when the goal can be reached again
+    tracker.set_edge_cost(7, 8, 1.0)
+    assert tracker.route.path[0] == 0 and tracker.route.path[-1] == 8
+    assert tracker.route.cost == approx(4.0)
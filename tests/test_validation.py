@@ -0,0 +1,43 @@
+from warehouseroute.graph import Node, Position
+from warehouseroute.location import AreaLocation
+from warehouseroute.shortestpath import PathFinder
+from warehouseroute.validation import GraphValidator
+
+
+def test_validate_valid_graph(grid_graph):
+
+    report = GraphValidator().validate(grid_graph)
+
+    # Test that a connected grid without problems is valid
+    assert report.is_valid()
+    assert report.asymmetric_edges == []
+    assert report.unreachable_nodes == []
+    assert set(report.strong_components.values()) == {0}
+    assert grid_graph.weak_components == report.weak_components
+
+
+def test_validate_broken_graph(graph1, node1, node2, node3):
+
+    # Add a dangling edge and a node with the same location as node 3
+    node1.add_edge(999, 1.0)
+    graph1.add_node(Node(158, AreaLocation("BUFF4"), Position(0.0, 0.0)))
+
+    report = GraphValidator().validate(graph1)
+    assert not report.is_valid()
+    assert report.dangling_edges == [(node1.id, 999)]
+    assert report.duplicate_locations == [[node3.id, 158]]
+    assert (node1.id, node2.id) in report.asymmetric_edges
+
+    # Every node is its own strongly connected component, and node 158 is
+    # not connected to the others
+    assert len(set(report.strong_components.values())) == 4
+    assert len(set(report.weak_components.values())) == 2
+    assert report.weak_components[158] != report.weak_components[node1.id]
+
+    # Test that queries between weak components fail without searching
+    assert PathFinder().shortest_path(graph1, node1.id, 158) is None
+
+    # Test that the components are kept when an edge cost changes
+    components = graph1.weak_components
+    graph1.set_edge_cost(node1.id, node2.id, 2.0)
+    assert graph1.weak_components is components
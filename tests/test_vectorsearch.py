@@ -0,0 +1,56 @@
+from pytest import approx, mark
+from warehouseroute.graph import Node, Position
+from warehouseroute.location import RackLocation
+from warehouseroute.parser import GraphParser
+from warehouseroute.shortestpath import PathFinder
+from warehouseroute.vectorsearch import VectorizedPathFinder
+
+
+@mark.parametrize('precompute, vector_degree', [(True, 16), (False, 16), (False, 0)])
+def test_vectorized_costs(grid_graph, precompute, vector_degree):
+
+    vectorized = VectorizedPathFinder(grid_graph, precompute=precompute,
+                                      vector_degree=vector_degree)
+    po = PathFinder()
+
+    # Test that the costs are the same as with the per-call heuristic
+    for start in grid_graph.nodes:
+        for end in grid_graph.nodes:
+            route = vectorized.shortest_path(start, end)
+            assert route.path[0] == start and route.path[-1] == end
+            assert route.cost == approx(po.shortest_path(grid_graph, start, end).cost)
+
+
+def test_vectorized_example_graph():
+
+    G = GraphParser().parse_json('examples/warehouse_with_crossaisle.json')
+    po = PathFinder()
+    node_ids = sorted(G.nodes)[::7]
+    for precompute in [True, False]:
+        vectorized = VectorizedPathFinder(G, precompute=precompute)
+        for start in node_ids:
+            for end in node_ids:
+                expected = po.shortest_path(G, start, end)
+                route = vectorized.shortest_path(start, end)
+                if expected is None:
+                    assert route is None
+                else:
+                    assert route.cost == approx(expected.cost)
+
+
+def test_vectorized_no_path(grid_graph):
+
+    # Test that an isolated node gives no route
+    grid_graph.add_node(Node(9, RackLocation("GRID", "1", "3", "3"), Position(3, 3)))
+    vectorized = VectorizedPathFinder(grid_graph)
+    assert vectorized.shortest_path(0, 9) is None
+
+
+def test_vectorized_graph_changes(grid_graph):
+
+    vectorized = VectorizedPathFinder(grid_graph)
+    assert vectorized.shortest_path(0, 2).cost == approx(2.0)
+
+    # Test that the arrays follow edge cost changes
+    grid_graph.set_edge_cost(0, 1, float('inf'))
+    assert vectorized.shortest_path(0, 2).cost == approx(4.0)
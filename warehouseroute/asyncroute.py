@@ -0,0 +1,110 @@
+import asyncio
+from concurrent.futures import Executor
+from graph import Graph
+from shortestpath import PathFinder, Route
+
+
+class _InFlightSearch:
+    '''
+    A search that is running in the executor and the number of callers that
+    are awaiting its result.
+    '''
+
+    def __init__(self, future: asyncio.Future):
+        self.future = future
+        self.waiters = 0
+
+
+class AsyncPathFinder:
+    '''
+    Asyncio facade for PathFinder.
+
+    A shortest path search is CPU bound and would block the event loop for
+    the whole search if called directly from a coroutine. AsyncPathFinder
+    runs the searches in an executor instead, by default the default thread
+    pool executor of the event loop, so that other coroutines keep running.
+
+    Identical requests, i.e. with the same start and end node, that are made
+    while a search is already running are merged and await the result of
+    the running search. When every caller awaiting a search has timed out or
+    been cancelled, the search is cancelled as well. A search that has not
+    been started by the executor yet is then dropped, while a search that is
+    already running finishes in the background since threads cannot be
+    interrupted.
+
+    Attributes
+    ----------
+    G: Graph, the graph structure of warehouse locations
+    path_finder: PathFinder, used to run the searches
+    executor: Executor, the executor to run the searches in, None for the
+        default executor of the event loop
+    '''
+
+    def __init__(self, G: Graph, path_finder: PathFinder = None,
+                 executor: Executor = None):
+        self.G = G
+        self.path_finder = path_finder if path_finder is not None else PathFinder()
+        self.executor = executor
+        self._in_flight = {}
+
+    async def shortest_path(self, start: int, end: int, timeout: float = None) -> Route:
+        '''
+        Calculate the shortest path without blocking the event loop.
+
+        Parameters
+        ----------
+        start: int, the start node
+        end: int, the end node
+        timeout: float, the maximum time in seconds to wait for the result,
+            None to wait until the search is done
+
+        Returns
+        ----------
+        route: Route, the shortest route, or None if there is no path or if
+            the search did not finish before the timeout
+        '''
+        key = (start, end)
+        search = self._in_flight.get(key)
+        if search is None:
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(self.executor,
+                                          self.path_finder.shortest_path,
+                                          self.G, start, end)
+            search = _InFlightSearch(future)
+            self._in_flight[key] = search
+            future.add_done_callback(lambda _: self.__forget(key, search))
+
+        search.waiters += 1
+        try:
+            return await asyncio.wait_for(asyncio.shield(search.future), timeout)
+        except asyncio.TimeoutError:
+            return None
+        finally:
+            search.waiters -= 1
+            if search.waiters == 0 and not search.future.done():
+                search.future.cancel()
+
+    async def shortest_paths(self, pairs: list[tuple[int, int]],
+                             timeout: float = None) -> list[Route]:
+        '''
+        Calculate the shortest paths between several pairs of nodes
+        concurrently.
+
+        Parameters
+        ----------
+        pairs: list of tuples, (start node, end node) of each route
+        timeout: float, the maximum time in seconds to wait for the batch,
+            None to wait until all searches are done
+
+        Returns
+        ----------
+        routes: list of Route, in the same order as the pairs, with None for
+            pairs without a path or whose search did not finish in time
+        '''
+        return await asyncio.gather(
+            *(self.shortest_path(start, end, timeout) for start, end in pairs))
+
+    def __forget(self, key: tuple[int, int], search: _InFlightSearch):
+        ''' Remove a finished search from the in-flight searches '''
+        if self._in_flight.get(key) is search:
+            del self._in_flight[key]
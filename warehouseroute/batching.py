@@ -0,0 +1,289 @@
+from time import perf_counter
+import numpy as np
+from graph import Graph
+from pathtree import ShortestPathTree
+from shortestpath import PathFinder, Route
+
+
+class Batch:
+    '''
+    A batch of orders that is picked on one tour.
+
+    Attributes
+    ----------
+    orders: list, the order ID:s in the batch
+    route: Route, the tour from the depot through all pick locations of the
+        orders and back to the depot
+    '''
+
+    def __init__(self, orders: list, route: Route):
+        self.orders = orders
+        self.route = route
+
+    def __str__(self):
+        return 'Orders: ' + ' '.join(map(str, self.orders)) + ' ' + str(self.route)
+
+
+class OrderBatcher:
+    '''
+    Order batching based on routing distances.
+
+    Groups orders into batches of at most max_orders orders, and at most
+    max_locations pick locations if given, so that the total length of the
+    tours that pick the batches is small. Every tour starts and ends at the
+    depot node.
+
+    The distances between the depot and all pick locations are computed once
+    with one shortest path tree per location. The heuristics compare many
+    candidate batches at a time, so the tour lengths of the candidates are
+    estimated together with NumPy, as nearest neighbour tours over the
+    distance matrix. Two heuristics are available:
+
+    - savings: starts with one batch per order and repeatedly merges the two
+      batches whose combined tour saves the most distance compared to their
+      separate tours (Clarke and Wright).
+    - seed: starts a batch with the unassigned order furthest from the depot
+      and repeatedly adds the order that makes its tour the least longer,
+      until the batch is full.
+
+    When the time limit is reached, the savings heuristic keeps the batches
+    merged so far, and the seed heuristic puts the remaining orders into
+    batches in the order they were given. The tour of every batch is then
+    improved with 2-opt and returned as a Route through the graph.
+
+    Attributes
+    ----------
+    G: Graph, the graph structure of warehouse locations
+    depot: int, the node where all tours start and end
+    max_orders: int, the maximum number of orders in a batch
+    max_locations: int, the maximum number of pick locations in a batch, or
+        None for no limit
+    '''
+
+    def __init__(self, G: Graph, depot: int, max_orders: int = 10,
+                 max_locations: int = None):
+        self.G = G
+        self.depot = depot
+        self.max_orders = max_orders
+        self.max_locations = max_locations
+
+    def batch(self, orders: dict, method: str = 'savings',
+              time_limit: float = 10.0) -> list[Batch]:
+        '''
+        Group orders into batches. A ValueError naming the orders is raised
+        if a pick location cannot be reached from the depot or the depot
+        cannot be reached from it.
+
+        Parameters
+        ----------
+        orders: dict, key: order ID, value: list of node ID:s of the pick
+            locations of the order
+        method: str, the batching heuristic, savings or seed
+        time_limit: float, the maximum time in seconds for the heuristic
+
+        Returns
+        ----------
+        batches: list of Batch, with the orders and tour of each batch
+        '''
+        if not orders:
+            return []
+        deadline = perf_counter() + time_limit
+        order_ids = list(orders)
+        nodes = [self.depot] + sorted(
+            {n for locations in orders.values() for n in locations} - {self.depot})
+        index = {nodeid: i for i, nodeid in enumerate(nodes)}
+        self._trees = self.__trees(nodes)
+        self._dist = np.array(
+            [[tree.dist.get(nodeid, np.inf) for nodeid in nodes]
+             for tree in self._trees])
+
+        # Order-location membership, one row per order
+        members = np.zeros((len(order_ids), len(nodes)), dtype=bool)
+        for i, order_id in enumerate(order_ids):
+            members[i, [index[n] for n in orders[order_id]]] = True
+        members[:, 0] = False
+
+        # Locations that can be reached from the depot and back can also be
+        # reached from each other through the depot
+        unreachable = ~np.isfinite(self._dist[0]) | ~np.isfinite(self._dist[:, 0])
+        if unreachable.any():
+            raise ValueError('Orders with locations that cannot be reached from '
+                             'and back to the depot: ' + ', '.join(
+                                 str(order_ids[i]) for i in
+                                 np.flatnonzero(members[:, unreachable].any(axis=1))))
+
+        if method == 'savings':
+            groups = self.__savings(members, deadline)
+        elif method == 'seed':
+            groups = self.__seed(members, deadline)
+        else:
+            raise ValueError('Invalid batching method ' + str(method))
+
+        batches = []
+        for group in groups:
+            locations = np.flatnonzero(members[group].any(axis=0))
+            tour = self.__two_opt(self.__nearest_neighbour_tour(locations))
+            batches.append(Batch([order_ids[i] for i in group],
+                                 self.__route(tour, nodes)))
+        return batches
+
+    def __tour_lengths(self, members: np.ndarray) -> np.ndarray:
+        '''
+        Estimate the tour lengths of many candidate batches at a time.
+
+        Each tour is a nearest neighbour tour from the depot through the
+        locations of the batch and back. All tours take one step at a time
+        together, so the work per step is a few vectorized operations over
+        the candidates.
+
+        Parameters
+        ----------
+        members: bool array, one row per candidate batch and one column per
+            location of the distance matrix, True if the batch visits it
+
+        Returns
+        ----------
+        lengths: float array, the tour length of each candidate
+        '''
+        remaining = members.copy()
+        remaining[:, 0] = False
+        rows = np.arange(len(members))
+        current = np.zeros(len(members), dtype=int)
+        lengths = np.zeros(len(members))
+        for _ in range(int(remaining.sum(axis=1).max(initial=0))):
+            dist = np.where(remaining, self._dist[current], np.inf)
+            nearest = dist.argmin(axis=1)
+            active = remaining[rows, nearest]
+            lengths += np.where(active, dist[rows, nearest], 0.0)
+            current = np.where(active, nearest, current)
+            remaining[rows[active], nearest[active]] = False
+        return lengths + self._dist[current, 0]
+
+    def __fits(self, members: np.ndarray, order_counts: np.ndarray) -> np.ndarray:
+        ''' Check the capacity of candidate batches '''
+        fits = order_counts <= self.max_orders
+        if self.max_locations is not None:
+            fits &= members.sum(axis=1) <= self.max_locations
+        return fits
+
+    def __savings(self, members: np.ndarray, deadline: float) -> list[list[int]]:
+        ''' Savings (Clarke and Wright) batching heuristic '''
+        groups = [[i] for i in range(len(members))]
+        batch_members = members.copy()
+        lengths = self.__tour_lengths(batch_members)
+        n = len(groups)
+        savings = np.full((n, n), -np.inf)
+        for i in range(n - 1):
+            if perf_counter() > deadline:
+                return groups
+            others = np.arange(i + 1, n)
+            savings[i, others] = self.__merge_savings(
+                i, others, groups, batch_members, lengths)
+
+        alive = np.ones(n, dtype=bool)
+        while perf_counter() <= deadline:
+            best = np.unravel_index(savings.argmax(), savings.shape)
+            if savings[best] <= 0:
+                break
+            i, j = sorted(best)
+            # Merge batch j into batch i
+            groups[i] += groups[j]
+            batch_members[i] |= batch_members[j]
+            lengths[i] = lengths[i] + lengths[j] - savings[i, j]
+            alive[j] = False
+            savings[j, :] = savings[:, j] = -np.inf
+            others = np.flatnonzero(alive)
+            others = others[others != i]
+            savings[i, :] = savings[:, i] = -np.inf
+            if len(others):
+                new = self.__merge_savings(i, others, groups, batch_members,
+                                           lengths)
+                savings[np.minimum(i, others), np.maximum(i, others)] = new
+        return [groups[i] for i in np.flatnonzero(alive)]
+
+    def __merge_savings(self, i: int, others: np.ndarray, groups: list,
+                        batch_members: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+        ''' Savings of merging batch i with each of the other batches '''
+        merged = batch_members[others] | batch_members[i]
+        counts = np.array([len(groups[i]) + len(groups[j]) for j in others])
+        saving = lengths[i] + lengths[others] - self.__tour_lengths(merged)
+        return np.where(self.__fits(merged, counts), saving, -np.inf)
+
+    def __seed(self, members: np.ndarray, deadline: float) -> list[list[int]]:
+        ''' Seed batching heuristic '''
+        unassigned = np.ones(len(members), dtype=bool)
+        depot_dist = np.where(members, self._dist[0], 0.0).max(axis=1)
+        groups = []
+        while unassigned.any():
+            if perf_counter() > deadline:
+                rest = list(np.flatnonzero(unassigned))
+                groups += [rest[k:k + self.max_orders]
+                           for k in range(0, len(rest), self.max_orders)]
+                break
+            seed = np.flatnonzero(unassigned)[depot_dist[unassigned].argmax()]
+            group = [seed]
+            unassigned[seed] = False
+            batch = members[seed].copy()
+            length = self.__tour_lengths(batch[None, :])[0]
+            while len(group) < self.max_orders and unassigned.any():
+                candidates = np.flatnonzero(unassigned)
+                merged = members[candidates] | batch
+                fits = self.__fits(merged, np.full(len(candidates), len(group) + 1))
+                if not fits.any():
+                    break
+                added = np.where(fits, self.__tour_lengths(merged) - length, np.inf)
+                best = added.argmin()
+                group.append(candidates[best])
+                unassigned[candidates[best]] = False
+                batch = merged[best]
+                length += added[best]
+            groups.append([int(i) for i in group])
+        return groups
+
+    def __nearest_neighbour_tour(self, locations: np.ndarray) -> list[int]:
+        ''' Nearest neighbour tour from the depot, as distance matrix indices '''
+        tour = [0]
+        remaining = set(int(i) for i in locations) - {0}
+        while remaining:
+            row = self._dist[tour[-1]]
+            nearest = min(remaining, key=lambda i: row[i])
+            tour.append(nearest)
+            remaining.remove(nearest)
+        return tour + [0]
+
+    def __two_opt(self, tour: list[int]) -> list[int]:
+        ''' Improve a tour by reversing segments while it gets shorter '''
+        dist = self._dist
+        improved = True
+        while improved:
+            improved = False
+            for i in range(1, len(tour) - 2):
+                for j in range(i + 1, len(tour) - 1):
+                    # Distances are not symmetric in general, so the reversed
+                    # segment is compared in full
+                    before = sum(dist[a, b] for a, b in zip(tour[i - 1:j + 1], tour[i:j + 2]))
+                    candidate = tour[:i] + tour[i:j + 1][::-1] + tour[j + 1:]
+                    after = sum(dist[a, b] for a, b in zip(candidate[i - 1:j + 1], candidate[i:j + 2]))
+                    if after < before - 1e-9:
+                        tour = candidate
+                        improved = True
+        return tour
+
+    def __route(self, tour: list[int], nodes: list[int]) -> Route:
+        ''' Expand a tour of distance matrix indices to a Route '''
+        path = [nodes[tour[0]]]
+        cost = 0.0
+        for a, b in zip(tour, tour[1:]):
+            leg = self._trees[a].route(nodes[b])
+            path.extend(leg.path[1:])
+            cost += leg.cost
+        return Route(path, cost)
+
+    def __trees(self, nodes: list[int]) -> list[ShortestPathTree]:
+        ''' Shortest path trees from the depot and every pick location '''
+        path_finder = PathFinder()
+        trees = []
+        for nodeid in nodes:
+            dist, pred = path_finder.shortest_path_tree(self.G, nodeid)
+            trees.append(ShortestPathTree(nodeid, dist, pred))
+        return trees
@@ -0,0 +1,226 @@
+import argparse
+import csv
+import json
+import sys
+import time
+from itertools import islice
+from multiprocessing import Pool
+from parser import GraphParser
+from shortestpath import PathFinder
+
+
+class BatchRouter:
+    '''
+    Router for batches of queries read from files.
+
+    A query is a dict with either a start and an end, or a list of stops
+    that are visited in order (a tour). Stops are given as node ID:s or as
+    location names, i.e. the string representation of the location, like in
+    the GUI. The result of a query is a dict with the route cost and path,
+    with cost and path None if there is no route, or an error message if the
+    query is invalid.
+
+    Attributes
+    ----------
+    G: Graph, the graph structure of warehouse locations
+    path_finder: PathFinder, used to find the routes
+    '''
+
+    def __init__(self, graphfile: str):
+        '''
+        Constructor, parses the graph
+
+        Parameters
+        ----------
+        graphfile: str, name of graph JSON file
+        '''
+        self.G = GraphParser().parse_json(graphfile)
+        self.path_finder = PathFinder()
+        self.__node_ids = {str(node.location): nodeid
+                           for nodeid, node in self.G.nodes.items()}
+
+    def route_query(self, query: dict) -> dict:
+        '''
+        Find the route for a query.
+
+        Parameters
+        ----------
+        query: dict, with keys start and end, or with key stops
+
+        Returns
+        ----------
+        result: dict, the query with the keys cost and path added, or with
+            the key error added if the query is invalid
+        '''
+        result = dict(query)
+        try:
+            if query.get('stops') or 'stops' in query and 'start' not in query:
+                if len(query['stops']) < 2:
+                    raise ValueError('A tour needs at least 2 stops')
+                stops = [self.__node_id(s) for s in query['stops']]
+            else:
+                stops = [self.__node_id(query['start']),
+                         self.__node_id(query['end'])]
+        except (KeyError, ValueError) as error:
+            result['error'] = 'Invalid query: ' + str(error)
+            return result
+
+        path = stops[:1]
+        cost = 0.0
+        for start, end in zip(stops, stops[1:]):
+            route = self.path_finder.shortest_path(self.G, start, end)
+            if route is None:
+                path, cost = None, None
+                break
+            path.extend(route.path[1:])
+            cost += route.cost
+        result['cost'] = cost
+        result['path'] = path
+        return result
+
+    def __node_id(self, stop) -> int:
+        ''' Get the node ID for a stop given as node ID or location name '''
+        if isinstance(stop, int) or (isinstance(stop, str) and stop.isdigit()):
+            nodeid = int(stop)
+            if nodeid not in self.G.nodes:
+                raise ValueError('No node ' + str(stop))
+            return nodeid
+        if stop not in self.__node_ids:
+            raise ValueError('No node for location ' + str(stop))
+        return self.__node_ids[stop]
+
+
+def read_queries(queryfile, file_format: str):
+    '''
+    Read queries one at a time from a CSV or JSONL file.
+
+    CSV files have a header with the columns start and end, or a column
+    stops where the stops are separated by semicolons. JSONL files have one
+    JSON object per line with the keys start and end, or a list of stops.
+
+    Parameters
+    ----------
+    queryfile: file object to read from
+    file_format: str, csv or jsonl
+
+    Yields
+    ----------
+    query: dict, with keys start and end, or with key stops
+    '''
+    if file_format == 'csv':
+        for row in csv.DictReader(queryfile):
+            if row.get('stops'):
+                row['stops'] = row['stops'].split(';')
+            else:
+                # Pairs in a file that also has tours leave the column empty
+                row.pop('stops', None)
+            yield row
+    else:
+        for line in queryfile:
+            if line.strip():
+                yield json.loads(line)
+
+
+_worker_router = None
+
+
+def _init_worker(graphfile: str):
+    ''' Parse the graph once in every worker process '''
+    global _worker_router
+    _worker_router = BatchRouter(graphfile)
+
+
+def _route_in_worker(query: dict) -> dict:
+    ''' Route a query with the router of the worker process '''
+    return _worker_router.route_query(query)
+
+
+def route_queries(graphfile: str, queries, workers: int = 1,
+                  chunk_size: int = 256):
+    '''
+    Route queries, optionally in parallel worker processes.
+
+    The queries are consumed in windows of a few chunks per worker, so
+    neither the queries nor the results are all kept in memory. The results
+    are yielded in the same order as the queries.
+
+    Parameters
+    ----------
+    graphfile: str, name of graph JSON file
+    queries: iterable of query dicts
+    workers: int, the number of worker processes, 1 to route in this process
+    chunk_size: int, the number of queries sent to a worker at a time
+
+    Yields
+    ----------
+    result: dict, the result of BatchRouter.route_query for each query
+    '''
+    queries = iter(queries)
+    if workers <= 1:
+        router = BatchRouter(graphfile)
+        for query in queries:
+            yield router.route_query(query)
+        return
+
+    window = chunk_size * workers * 4
+    with Pool(workers, initializer=_init_worker, initargs=(graphfile,)) as pool:
+        while True:
+            batch = list(islice(queries, window))
+            if not batch:
+                break
+            yield from pool.imap(_route_in_worker, batch, chunksize=chunk_size)
+
+
+def main(argv: list[str] = None):
+    ''' Command line entry point '''
+    arg_parser = argparse.ArgumentParser(
+        description='Get the shortest routes for a file of location pairs or tours.')
+    arg_parser.add_argument('graphfile', type=str, help='graph JSON file')
+    arg_parser.add_argument('queryfile', type=str,
+                            help='CSV or JSONL file with queries, - for stdin')
+    arg_parser.add_argument('-o', '--output', type=str, default='-',
+                            help='JSONL file to write the routes to, - for stdout')
+    arg_parser.add_argument('-f', '--format', choices=['csv', 'jsonl'],
+                            help='query file format, by default from the file extension')
+    arg_parser.add_argument('-w', '--workers', type=int, default=1,
+                            help='number of worker processes')
+    arg_parser.add_argument('--progress', type=float, default=10.0,
+                            help='seconds between progress reports, 0 for none')
+    args = arg_parser.parse_args(argv)
+
+    file_format = args.format
+    if file_format is None:
+        file_format = 'csv' if args.queryfile.endswith('.csv') else 'jsonl'
+
+    queryfile = sys.stdin if args.queryfile == '-' else \
+        open(args.queryfile, newline='')
+    outfile = sys.stdout if args.output == '-' else open(args.output, 'w')
+
+    started = last_report = time.perf_counter()
+    routed = failed = 0
+    try:
+        queries = read_queries(queryfile, file_format)
+        for result in route_queries(args.graphfile, queries, args.workers):
+            outfile.write(json.dumps(result) + '\n')
+            routed += 1
+            if result.get('path') is None:
+                failed += 1
+            now = time.perf_counter()
+            if args.progress and now - last_report >= args.progress:
+                last_report = now
+                print('routed {} queries, {:.0f} queries/s'.format(
+                    routed, routed / (now - started)), file=sys.stderr)
+    finally:
+        if queryfile is not sys.stdin:
+            queryfile.close()
+        if outfile is not sys.stdout:
+            outfile.close()
+
+    elapsed = time.perf_counter() - started
+    print('routed {} queries ({} without route) in {:.1f} s, {:.0f} queries/s'.format(
+        routed, failed, elapsed, routed / elapsed if elapsed > 0 else 0.0),
+        file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,198 @@
+import sqlite3
+import threading
+from graph import Graph
+from shortestpath import Route
+
+
+class DistanceStore:
+    '''
+    Persistent store of shortest routes, shared across processes.
+
+    The routes are stored in an SQLite database file, keyed by the content
+    hash of the graph and the start and end node ID:s. Routes computed for a
+    graph are therefore never returned for another graph, e.g. when the graph
+    JSON file has changed, and purge_stale removes them from the file. The
+    database runs in write-ahead logging mode, so several processes can read
+    from it while another one writes to it.
+
+    New routes are kept in memory and written to the database in batches of
+    batch_size routes, or when flush or close is called.
+
+    When the graph is changed through its methods, e.g. Graph.set_edge_cost,
+    the store notices that the graph revision has changed at the next call,
+    writes the pending routes for the previous content hash and computes
+    the new hash, so routes of the previous revision are not returned.
+
+    Attributes
+    ----------
+    filename: str, name of the database file
+    graph: Graph, the graph that the routes are computed for
+    graph_hash: str, content hash of the graph
+    batch_size: int, the number of routes that are written together
+    '''
+
+    def __init__(self, filename: str, G: Graph, batch_size: int = 1000,
+                 timeout: float = 30.0):
+        '''
+        Constructor, opens or creates the database file
+
+        Parameters
+        ----------
+        filename: str, name of the database file
+        G: Graph, the graph that the routes are computed for
+        batch_size: int, the number of routes that are written together
+        timeout: float, seconds to wait for another process that is writing
+        '''
+        self.filename = filename
+        self.graph = G
+        self.graph_hash = G.content_hash()
+        self.batch_size = batch_size
+        self._revision = G.revision
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(filename, timeout=timeout,
+                                           check_same_thread=False)
+        with self._lock, self._connection:
+            self._connection.execute('PRAGMA journal_mode=WAL')
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS routes ('
+                'graph_hash TEXT NOT NULL, start INTEGER NOT NULL, '
+                'end INTEGER NOT NULL, cost REAL NOT NULL, path TEXT NOT NULL, '
+                'PRIMARY KEY (graph_hash, start, end)) WITHOUT ROWID')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def get(self, start: int, end: int) -> Route:
+        '''
+        Get the stored route between two nodes.
+
+        Parameters
+        ----------
+        start: int, the start node
+        end: int, the end node
+
+        Returns
+        ----------
+        route: Route, the stored route, or None if there is none
+        '''
+        with self._lock:
+            self.__check_revision()
+            route = self._pending.get((start, end))
+            if route is not None:
+                return route
+            row = self._connection.execute(
+                'SELECT cost, path FROM routes '
+                'WHERE graph_hash = ? AND start = ? AND end = ?',
+                (self.graph_hash, start, end)).fetchone()
+        if row is None:
+            return None
+        cost, path = row
+        return Route([int(n) for n in path.split()], cost)
+
+    def put(self, start: int, end: int, route: Route):
+        '''
+        Add a route to the store. The route is written to the database file
+        with the next batch.
+
+        Parameters
+        ----------
+        start: int, the start node
+        end: int, the end node
+        route: Route, the shortest route from start to end
+        '''
+        with self._lock:
+            self.__check_revision()
+            self._pending[(start, end)] = route
+            if len(self._pending) >= self.batch_size:
+                self.__write_pending()
+
+    def flush(self):
+        ''' Write the pending routes to the database file '''
+        with self._lock:
+            self.__write_pending()
+            self.__check_revision()
+
+    def purge_stale(self) -> int:
+        '''
+        Remove the routes of all other graphs from the database file.
+
+        Returns
+        ----------
+        count: int, the number of removed routes
+        '''
+        with self._lock, self._connection:
+            self.__check_revision()
+            cursor = self._connection.execute(
+                'DELETE FROM routes WHERE graph_hash != ?', (self.graph_hash,))
+        return cursor.rowcount
+
+    def copy_routes(self, graph_hash: str, node_map: dict[int, int] = None,
+                    keep=None) -> int:
+        '''
+        Copy the routes of another graph in the database file to this graph,
+        e.g. the routes that are still the shortest ones in a new revision of
+        the layout.
+
+        Parameters
+        ----------
+        graph_hash: str, content hash of the other graph
+        node_map: dict, key: node ID in the other graph, value: node ID in
+            this graph, None if the node ID:s are the same. Routes through
+            nodes that are not in the map are not copied.
+        keep: function taking a start node, end node and Route of the other
+            graph and returning True if the route is copied, None to copy all
+            routes
+
+        Returns
+        ----------
+        count: int, the number of copied routes
+        '''
+        with self._lock:
+            rows = self._connection.execute(
+                'SELECT start, end, cost, path FROM routes WHERE graph_hash = ?',
+                (graph_hash,)).fetchall()
+        copied = 0
+        for start, end, cost, path in rows:
+            route = Route([int(n) for n in path.split()], cost)
+            if keep is not None and not keep(start, end, route):
+                continue
+            if node_map is not None:
+                if any(n not in node_map for n in route.path):
+                    continue
+                start, end = node_map[start], node_map[end]
+                route = Route([node_map[n] for n in route.path], cost)
+            self.put(start, end, route)
+            copied += 1
+        self.flush()
+        return copied
+
+    def close(self):
+        ''' Write the pending routes and close the database file '''
+        self.flush()
+        self._connection.close()
+
+    def __check_revision(self):
+        '''
+        Switch to the content hash of the current revision of the graph if
+        it has changed, lock must be held
+        '''
+        if self.graph.revision != self._revision:
+            self.__write_pending()
+            self.graph_hash = self.graph.content_hash()
+            self._revision = self.graph.revision
+
+    def __write_pending(self):
+        ''' Write the pending routes in one transaction, lock must be held '''
+        if not self._pending:
+            return
+        rows = [(self.graph_hash, start, end, route.cost,
+                 ' '.join(map(str, route.path)))
+                for (start, end), route in self._pending.items()]
+        with self._connection:
+            self._connection.executemany(
+                'INSERT OR REPLACE INTO routes VALUES (?, ?, ?, ?, ?)', rows)
+        self._pending = {}
@@ -1,9 +1,14 @@
 from enum import Enum
+from hashlib import sha256
 from math import sqrt
 # import itertools
 from location import Location
 
 
+# Access bitmask of edges that every vehicle class may use
+ALL_VEHICLES = -1
+
+
 class NodeType(Enum):
     RACK = 1
     AREA = 2
@@ -12,19 +17,24 @@ class NodeType(Enum):
 
 class Position:
     '''
-    Class that represents a 2D position.
+    Class that represents a 2D position on a floor.
 
     Attributes
     ----------
     x, float: x coordinate
     y, float: y coordinate
+    floor, int: floor or mezzanine level, 0 for the ground floor
     '''
 
-    def __init__(self, x: float, y: float):
+    def __init__(self, x: float, y: float, floor: int = 0):
         self.x = x
         self.y = y
+        self.floor = floor
 
     def __str__(self):
+        if self.floor:
+            return 'x ' + str(self.x) + ' y ' + str(self.y) + \
+                ' floor ' + str(self.floor)
         return 'x ' + str(self.x) + ' y ' + str(self.y)
 
 
@@ -36,11 +46,17 @@ class Edge:
     ----------
     to_node: int, to-node ID
     cost: float, the cost to traverse to the to-node
+    access: int, bitmask of the vehicle classes that may use the edge
+    connector: str, the kind of floor connector, e.g. lift or stairs, or
+        None for edges on a floor
     '''
 
-    def __init__(self, to_node: int, cost: float):
+    def __init__(self, to_node: int, cost: float, access: int = ALL_VEHICLES,
+                 connector: str = None):
         self.to_node = to_node
         self.cost = cost
+        self.access = access
+        self.connector = connector
 
     def __eq__(self, other):
         if isinstance(other, Edge):
@@ -77,7 +93,8 @@ class Node:
     def __str__(self):
         return 'node ' + str(self.id)
 
-    def add_edge(self, node_to: int, cost: float):
+    def add_edge(self, node_to: int, cost: float, access: int = ALL_VEHICLES,
+                 connector: str = None):
         '''
         Add an edge to the node
         
@@ -85,8 +102,10 @@ class Node:
         ----------
         node_to: int
         cost: float
+        access: int, bitmask of the vehicle classes that may use the edge
+        connector: str, the kind of floor connector, or None
         '''
-        edge = Edge(node_to, cost)
+        edge = Edge(node_to, cost, access, connector)
         if edge not in self.edges:
             self.edges.append(edge)
 
@@ -98,10 +117,23 @@ class Graph:
     Attributes:
     ----------
     nodes: list[Node], the nodes in the graph
+    strong_components: dict, key: node ID, value: strongly connected
+        component ID, set by GraphValidator, None if not validated
+    weak_components: dict, key: node ID, value: weakly connected component
+        ID, set by GraphValidator, None if not validated. Both component
+        dicts are reset when nodes or edges are added through the graph.
+        They are kept when edge costs change, since the components are
+        given by the edges and not by their costs.
+    revision: int, incremented by every change made through the graph, so
+        that caches of data computed from the graph can tell if it is stale
     '''
 
     def __init__(self):
         self.nodes = {}
+        self.strong_components = None
+        self.weak_components = None
+        self.revision = 0
+        self._connector_bound = None
 
     def __str__(self):
         return 'nodes ' + str(len(self.nodes))
@@ -110,6 +142,31 @@ class Graph:
         ''' Add a node to the graph '''
         if node.id not in self.nodes:
             self.nodes[node.id] = node
+            self.__changed()
+
+    def add_edge(self, node_from: int, node_to: int, cost: float,
+                 access: int = ALL_VEHICLES, connector: str = None):
+        '''
+        Add an edge to a node of the graph. Edges added directly to a Node
+        after the graph has been validated make the components stale.
+
+        Parameters
+        ----------
+        node_from: int, node ID
+        node_to: int, node ID
+        cost: float
+        access: int, bitmask of the vehicle classes that may use the edge
+        connector: str, the kind of floor connector, or None
+        '''
+        self.nodes[node_from].add_edge(node_to, cost, access, connector)
+        self.__changed()
+
+    def __changed(self):
+        ''' Reset the data computed from the nodes and edges '''
+        self.strong_components = None
+        self.weak_components = None
+        self._connector_bound = None
+        self.revision += 1
 
     def len(self):
         ''' Get the number of nodes in the graph '''
@@ -153,6 +210,56 @@ class Graph:
                 break
         return cost
 
+    def set_edge_cost(self, node_from: int, node_to: int, cost: float) -> float:
+        '''
+        Change the cost of the edge from node_from to node_to, e.g. when an
+        aisle gets congested, or blocked with an infinite cost, which the
+        searches treat as a missing edge. The graph revision is incremented,
+        so DistanceStore, TreeCache and RoutingProfile drop their data of
+        the previous revision. The components are kept, since a blocked
+        edge can only make fewer nodes reachable, and the connector bound is
+        only computed again for an edge between floors.
+
+        Parameters
+        ----------
+        node_from: int, node ID
+        node_to: int, node ID
+        cost: float, the new cost of the edge
+
+        Returns
+        ----------
+        old_cost: float, the previous cost of the edge
+        '''
+        for edge in self.nodes[node_from].edges:
+            if edge.to_node == node_to:
+                old_cost = edge.cost
+                edge.cost = cost
+                if node_to in self.nodes and self.nodes[node_to].position.floor \
+                        != self.nodes[node_from].position.floor:
+                    self._connector_bound = None
+                self.revision += 1
+                return old_cost
+        raise ValueError('No edge from node ' + str(node_from) +
+                         ' to node ' + str(node_to))
+
+    def reverse_edges(self) -> dict[int, list[Edge]]:
+        '''
+        Get the edges of the graph with their direction reversed.
+
+        Used by searches that run backwards from a target node. The to_node
+        of every returned edge is the node the original edge started from.
+
+        Returns
+        ----------
+        reverse: dict, key: node ID, value: list of reversed Edges into it
+        '''
+        reverse = {nodeid: [] for nodeid in self.nodes}
+        for nodeid, node in self.nodes.items():
+            for edge in node.edges:
+                reverse.setdefault(edge.to_node, []).append(
+                    Edge(nodeid, edge.cost))
+        return reverse
+
     def get_node_for_location(self, location: Location) -> Node:
         '''
         Get the graph node corresponding to the input location name.
@@ -197,6 +304,11 @@ class Graph:
         Heuristic used in the A* algorithm to estimate the distance from node
         1 to node 2 using Euclidean distance.
 
+        For nodes on different floors, the smallest cost that a floor
+        connector adds on top of its horizontal distance is added, since
+        every path between the floors uses at least one connector. Nodes on
+        the same floor take the same path as a single-floor graph.
+
         Parameters
         ----------
         node1: int, start node
@@ -210,8 +322,57 @@ class Graph:
         b: Position = self.nodes[node2].position
         dx = abs(a.x - b.x)
         dy = abs(a.y - b.y)
+        if a.floor != b.floor:
+            return sqrt(dx * dx + dy * dy) + self.connector_bound()
         return sqrt(dx * dx + dy * dy)
 
+    def floors(self) -> list[int]:
+        ''' Get the sorted list of floors that the nodes are on '''
+        return sorted({n.position.floor for n in self.nodes.values()})
+
+    def connector_bound(self) -> float:
+        '''
+        Get the smallest cost of an edge between floors minus the horizontal
+        distance it covers, which is a lower bound of the extra cost of
+        changing floors. The bound is computed the first time it is needed.
+        '''
+        if self._connector_bound is None:
+            bound = None
+            for node in self.nodes.values():
+                a = node.position
+                for edge in node.edges:
+                    if edge.to_node not in self.nodes:
+                        continue
+                    b = self.nodes[edge.to_node].position
+                    if a.floor != b.floor:
+                        extra = edge.cost - sqrt((a.x - b.x) ** 2 + (a.y - b.y) ** 2)
+                        if bound is None or extra < bound:
+                            bound = extra
+            self._connector_bound = max(bound or 0.0, 0.0)
+        return self._connector_bound
+
+    def content_hash(self) -> str:
+        '''
+        Get a hash of the nodes, locations, positions and edges of the graph.
+
+        Graphs parsed from JSON files with the same content get the same hash,
+        so the hash can be used to tell if results computed for one graph are
+        valid for another one. The order of the nodes and edges is ignored.
+
+        Returns
+        ----------
+        digest: str, hexadecimal SHA-256 digest
+        '''
+        digest = sha256()
+        for nodeid in sorted(self.nodes):
+            node = self.nodes[nodeid]
+            digest.update(repr((
+                nodeid, type(node.location).__name__, str(node.location),
+                node.position.x, node.position.y, node.position.floor,
+                sorted((e.to_node, e.cost, e.access, e.connector or '')
+                       for e in node.edges))).encode())
+        return digest.hexdigest()
+
     def get_locations(self) -> list[Location]:
         ''' Get list of the locations in the graph '''
         locations = [n.location for n in self.nodes.values()]
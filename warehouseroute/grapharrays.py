@@ -0,0 +1,177 @@
+from heapq import heappush, heappop
+from multiprocessing import shared_memory
+import numpy as np
+from graph import Graph
+
+
+class GraphArrays:
+    '''
+    Graph stored in contiguous NumPy arrays.
+
+    The nodes are numbered by their index in node_ids, and the edges are
+    stored in compressed sparse row (CSR) format: the edges from the node
+    with index i are edge k for indptr[i] <= k < indptr[i + 1], going to the
+    node with index indices[k] at cost costs[k]. The reverse edges, i.e. the
+    edges into each node, are stored the same way. Node positions are stored
+    as separate x, y and floor arrays.
+
+    The arrays can be moved to shared memory, so that worker processes can
+    use the graph without copying it.
+
+    Attributes
+    ----------
+    node_ids: int array, the node ID of each node index
+    index: dict, key: node ID, value: node index
+    x, y: float arrays, node coordinates
+    floor: int array, node floors
+    indptr, indices, costs, access: CSR arrays of the edges
+    rindptr, rindices, rcosts: CSR arrays of the reverse edges
+    '''
+
+    ARRAYS = ['node_ids', 'x', 'y', 'floor', 'indptr', 'indices', 'costs',
+              'access', 'rindptr', 'rindices', 'rcosts']
+
+    def __init__(self, arrays: dict[str, np.ndarray], shared: list = None):
+        for name in self.ARRAYS:
+            setattr(self, name, arrays[name])
+        self.index = {int(nodeid): i for i, nodeid in enumerate(self.node_ids)}
+        self._shared = shared or []
+        self._lists = {}
+
+    def __len__(self):
+        return len(self.node_ids)
+
+    @staticmethod
+    def from_graph(G: Graph) -> 'GraphArrays':
+        '''
+        Convert a graph to arrays. Edges to node ID:s that are not in the
+        graph are left out.
+
+        Parameters
+        ----------
+        G: Graph, the graph structure of warehouse locations
+
+        Returns
+        ----------
+        arrays: GraphArrays
+        '''
+        node_ids = np.array(sorted(G.nodes), dtype=np.int64)
+        index = {int(nodeid): i for i, nodeid in enumerate(node_ids)}
+        nodes = [G.nodes[int(nodeid)] for nodeid in node_ids]
+        edges = [(index[n.id], index[e.to_node], e.cost, e.access)
+                 for n in nodes for e in n.edges if e.to_node in index]
+        edge_array = np.array([(a, b) for a, b, _, _ in edges],
+                              dtype=np.int64).reshape(-1, 2)
+        costs = np.array([c for _, _, c, _ in edges], dtype=np.float64)
+        access = np.array([m for _, _, _, m in edges], dtype=np.int64)
+        arrays = {
+            'node_ids': node_ids,
+            'x': np.array([n.position.x for n in nodes], dtype=np.float64),
+            'y': np.array([n.position.y for n in nodes], dtype=np.float64),
+            'floor': np.array([n.position.floor for n in nodes], dtype=np.int64),
+            'access': access,
+        }
+        # The edges are listed by node index, so the access masks are already
+        # in CSR order
+        arrays['indptr'], arrays['indices'], arrays['costs'] = \
+            GraphArrays.__csr(len(nodes), edge_array[:, 0], edge_array[:, 1], costs)
+        arrays['rindptr'], arrays['rindices'], arrays['rcosts'] = \
+            GraphArrays.__csr(len(nodes), edge_array[:, 1], edge_array[:, 0], costs)
+        return GraphArrays(arrays)
+
+    @staticmethod
+    def __csr(n: int, rows: np.ndarray, cols: np.ndarray, values: np.ndarray):
+        ''' Build CSR arrays from edge rows, columns and values '''
+        order = np.argsort(rows, kind='stable')
+        indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=n), out=indptr[1:])
+        return indptr, cols[order], values[order]
+
+    def to_shared(self) -> dict:
+        '''
+        Copy the arrays to shared memory.
+
+        Returns
+        ----------
+        descriptor: dict, picklable description of the shared arrays, which
+            attach uses to open them in another process
+        '''
+        descriptor = {}
+        for name in self.ARRAYS:
+            array = getattr(self, name)
+            block = shared_memory.SharedMemory(create=True,
+                                               size=max(array.nbytes, 1))
+            np.ndarray(array.shape, array.dtype, buffer=block.buf)[:] = array
+            self._shared.append(block)
+            descriptor[name] = (block.name, array.dtype.str, array.shape)
+        return descriptor
+
+    @staticmethod
+    def attach(descriptor: dict) -> 'GraphArrays':
+        '''
+        Open arrays that another process has copied to shared memory.
+
+        Parameters
+        ----------
+        descriptor: dict, returned by to_shared
+
+        Returns
+        ----------
+        arrays: GraphArrays, backed by the shared memory
+        '''
+        arrays = {}
+        shared = []
+        for name, (block_name, dtype, shape) in descriptor.items():
+            block = shared_memory.SharedMemory(name=block_name)
+            shared.append(block)
+            arrays[name] = np.ndarray(shape, dtype, buffer=block.buf)
+        return GraphArrays(arrays, shared)
+
+    def release(self, unlink: bool = False):
+        '''
+        Close the shared memory of the arrays, and free it if unlink is True,
+        which only the process that called to_shared should do.
+        '''
+        for block in self._shared:
+            block.close()
+            if unlink:
+                block.unlink()
+        self._shared = []
+
+    def dijkstra(self, source: int, reverse: bool = False) -> np.ndarray:
+        '''
+        Calculate the cost from a node to all nodes, or from all nodes to a
+        node if reverse is True, using Dijkstra's algorithm.
+
+        Parameters
+        ----------
+        source: int, node index of the source
+        reverse: bool, use the reverse edges
+
+        Returns
+        ----------
+        dist: float array, the cost for every node index, inf if unreachable
+        '''
+        if reverse:
+            indptr, indices, costs = self.rindptr, self.rindices, self.rcosts
+        else:
+            indptr, indices, costs = self.indptr, self.indices, self.costs
+        # Plain lists are faster than NumPy arrays for single element access
+        if reverse not in self._lists:
+            self._lists[reverse] = (indptr.tolist(), indices.tolist(),
+                                    costs.tolist())
+        indptr, indices, costs = self._lists[reverse]
+        dist = [float('inf')] * len(self)
+        dist[source] = 0.0
+        open_nodes = [(0.0, source)]
+        while open_nodes:
+            cost, current = heappop(open_nodes)
+            if cost > dist[current]:
+                continue
+            for k in range(indptr[current], indptr[current + 1]):
+                neighbor = indices[k]
+                new_cost = cost + costs[k]
+                if new_cost < dist[neighbor]:
+                    dist[neighbor] = new_cost
+                    heappush(open_nodes, (new_cost, neighbor))
+        return np.array(dist)
@@ -0,0 +1,191 @@
+from math import inf
+from graph import Edge, Graph
+
+
+def location_key(node) -> tuple[str, str]:
+    ''' Identity of the location of a node that is kept across revisions '''
+    return type(node.location).__name__, str(node.location)
+
+
+class LayoutDiff:
+    '''
+    Differences between two revisions of a layout graph.
+
+    Nodes are matched by their location, not by their node ID, since the
+    node ID:s of a location may change between revisions of the layout JSON
+    file. Nodes and edges of the old graph are given by old node ID:s, and
+    nodes and edges of the new graph by new node ID:s.
+
+    Attributes
+    ----------
+    node_map: dict, key: old node ID, value: new node ID, for the locations
+        that are in both graphs
+    added: list of int, new node ID:s of the locations only in the new graph
+    removed: list of int, old node ID:s of the locations only in the old
+        graph
+    moved: list of int, new node ID:s of the matched nodes whose position
+        changed
+    added_edges: list of (from, to, Edge), edges only in the new graph
+    removed_edges: list of (from, to, Edge), edges only in the old graph
+    changed_edges: list of (from, to, old Edge, new Edge), matched edges
+        whose cost, access mask or connector changed, with new node ID:s
+    '''
+
+    def __init__(self):
+        self.node_map = {}
+        self.added = []
+        self.removed = []
+        self.moved = []
+        self.added_edges = []
+        self.removed_edges = []
+        self.changed_edges = []
+
+    def __str__(self):
+        return ('nodes added {} removed {} moved {} renumbered {} '
+                'edges added {} removed {} changed {}').format(
+            len(self.added), len(self.removed), len(self.moved),
+            sum(old != new for old, new in self.node_map.items()),
+            len(self.added_edges), len(self.removed_edges),
+            len(self.changed_edges))
+
+    def is_empty(self) -> bool:
+        ''' Check if the graphs have the same nodes, positions and edges '''
+        return not (self.added or self.removed or self.moved or
+                    self.added_edges or self.removed_edges or
+                    self.changed_edges or self.renumbered())
+
+    def renumbered(self) -> bool:
+        ''' Check if any location has a new node ID '''
+        return any(old != new for old, new in self.node_map.items())
+
+    def edges_changed(self) -> bool:
+        ''' Check if any edge was added, removed or changed '''
+        return bool(self.added_edges or self.removed_edges or self.changed_edges)
+
+    def topology_changed(self) -> bool:
+        '''
+        Check if nodes or edges were added or removed, or if the access mask
+        of an edge changed, i.e. if any node can reach other nodes than
+        before
+        '''
+        return bool(self.added or self.removed or self.added_edges or
+                    self.removed_edges) or any(
+            new.access != old.access for _, _, old, new in self.changed_edges)
+
+    def costs_decreased(self) -> bool:
+        '''
+        Check if any path can have become cheaper, i.e. if an edge was added
+        or the cost of an edge decreased
+        '''
+        return bool(self.added_edges) or any(
+            new.cost < old.cost for _, _, old, new in self.changed_edges)
+
+    def affects_tree(self, tree) -> bool:
+        '''
+        Check if a shortest path tree of the old graph differs from the tree
+        of the new graph, other than by the node ID:s.
+
+        The tree is affected if it contains a removed node, if an edge of the
+        tree was removed or got more expensive, or if an added or cheaper edge
+        gives a node of the tree a cheaper path, or a path to a node that the
+        tree does not reach. Changes elsewhere in the graph are not checked.
+
+        Parameters
+        ----------
+        tree: ShortestPathTree, a forward or reverse tree of the old graph
+
+        Returns
+        ----------
+        affected: bool, True if the tree must be built again
+        '''
+        dist, pred = tree.dist, tree.pred
+        if any(nodeid in dist for nodeid in self.removed):
+            return True
+        old_ids = {new: old for old, new in self.node_map.items()}
+
+        def in_tree_edge(node_from, node_to):
+            if tree.reverse:
+                return pred.get(node_from) == node_to
+            return pred.get(node_to) == node_from
+
+        def shortcut(node_from, node_to, cost):
+            if tree.reverse:
+                return dist.get(node_to, inf) + cost < dist.get(node_from, inf)
+            return dist.get(node_from, inf) + cost < dist.get(node_to, inf)
+
+        for node_from, node_to, _ in self.removed_edges:
+            if in_tree_edge(node_from, node_to):
+                return True
+        for node_from, node_to, old, new in self.changed_edges:
+            node_from, node_to = old_ids[node_from], old_ids[node_to]
+            if new.cost > old.cost and in_tree_edge(node_from, node_to) or \
+                    new.cost < old.cost and shortcut(node_from, node_to, new.cost):
+                return True
+        for node_from, node_to, edge in self.added_edges:
+            # Nodes that are not in the old graph get no old ID, and reach
+            # or are reached at infinite cost
+            if shortcut(old_ids.get(node_from), old_ids.get(node_to), edge.cost):
+                return True
+        return False
+
+
+def diff_graphs(old: Graph, new: Graph) -> LayoutDiff:
+    '''
+    Compare two revisions of a layout graph by location.
+
+    Locations that several nodes of a graph share are matched in the order
+    of their node ID:s.
+
+    Parameters
+    ----------
+    old: Graph, the current graph
+    new: Graph, the new revision of the graph
+
+    Returns
+    ----------
+    diff: LayoutDiff, the added, removed and moved nodes and the added,
+        removed and changed edges
+    '''
+    diff = LayoutDiff()
+    new_by_location = {}
+    for nodeid in sorted(new.nodes):
+        new_by_location.setdefault(location_key(new.nodes[nodeid]), []).append(nodeid)
+    for nodeid in sorted(old.nodes):
+        matches = new_by_location.get(location_key(old.nodes[nodeid]))
+        if matches:
+            diff.node_map[nodeid] = matches.pop(0)
+        else:
+            diff.removed.append(nodeid)
+    matched = set(diff.node_map.values())
+    diff.added = [nodeid for nodeid in sorted(new.nodes) if nodeid not in matched]
+
+    for old_id, new_id in diff.node_map.items():
+        a = old.nodes[old_id].position
+        b = new.nodes[new_id].position
+        if (a.x, a.y, a.floor) != (b.x, b.y, b.floor):
+            diff.moved.append(new_id)
+
+    for old_id, node in old.nodes.items():
+        new_id = diff.node_map.get(old_id)
+        new_edges = {} if new_id is None else \
+            {e.to_node: e for e in new.nodes[new_id].edges}
+        for edge in node.edges:
+            new_edge = new_edges.get(diff.node_map.get(edge.to_node))
+            if new_edge is None:
+                diff.removed_edges.append((old_id, edge.to_node, edge))
+            elif not _same_edge(edge, new_edge):
+                diff.changed_edges.append((new_id, new_edge.to_node, edge, new_edge))
+    old_ids = {new_id: old_id for old_id, new_id in diff.node_map.items()}
+    for new_id, node in new.nodes.items():
+        old_id = old_ids.get(new_id)
+        old_targets = set() if old_id is None else \
+            {diff.node_map.get(e.to_node) for e in old.nodes[old_id].edges}
+        for edge in node.edges:
+            if edge.to_node not in old_targets:
+                diff.added_edges.append((new_id, edge.to_node, edge))
+    return diff
+
+
+def _same_edge(a: Edge, b: Edge) -> bool:
+    ''' Compare the attributes of two edges, not only their to-nodes '''
+    return (a.cost, a.access, a.connector) == (b.cost, b.access, b.connector)
@@ -0,0 +1,195 @@
+import threading
+import weakref
+from distancestore import DistanceStore
+from graph import Graph
+from layoutdiff import LayoutDiff, diff_graphs
+from parser import GraphParser
+from pathtree import ShortestPathTree, TreeCache
+from preprocessing import PreprocessingPipeline
+from shortestpath import PathFinder, Route
+
+
+class LiveGraph:
+    '''
+    Layout graph that can be replaced by a new revision while it is queried.
+
+    Queries take a snapshot of the current graph and its PathFinder, and
+    swap publishes a new graph and PathFinder together in one assignment,
+    so a query that is running when the graph is swapped finishes on the
+    old revision, and no query waits for a swap. Swaps are serialized.
+
+    Before the new revision is published, its caches are prepared from the
+    caches of the old revision, keeping what the layout diff does not touch:
+
+    - shortest path trees that the diff does not affect are moved to a new
+      TreeCache with the new node ID:s, and the affected trees are built
+      again for the new graph
+    - stored routes are copied to the new graph in the DistanceStore if no
+      edge was added or got cheaper, which could give a shorter route, and
+      the route does not use a removed or more expensive edge. The store of
+      the old revision is closed once no snapshot of it is referenced
+    - the routing profiles give the new graph its own edge cost multipliers
+      with the new node ID:s, dropping those of removed nodes, and their
+      edge components are kept if no node or edge was added or removed and
+      no access mask changed
+    - the preprocessing artifacts in artifacts_dir are refreshed, running
+      only the stages that the diff touches
+
+    Attributes
+    ----------
+    version: int, the number of swaps so far
+    profiles: list of RoutingProfile, the profiles whose caches are kept
+    artifacts_dir: str, the output directory of PreprocessingPipeline for
+        the graph, or None
+    workers: int, the number of worker processes for preprocessing
+    '''
+
+    def __init__(self, G: Graph, trees: TreeCache = None,
+                 store: DistanceStore = None, profiles: list = None,
+                 artifacts_dir: str = None, workers: int = None):
+        self._current = (G, PathFinder(store, trees))
+        self.version = 0
+        self.profiles = list(profiles or [])
+        self.artifacts_dir = artifacts_dir
+        self.workers = workers
+        self._lock = threading.Lock()
+        self._retired_stores = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @property
+    def G(self) -> Graph:
+        ''' The current graph '''
+        return self._current[0]
+
+    @property
+    def path_finder(self) -> PathFinder:
+        ''' The PathFinder of the current graph '''
+        return self._current[1]
+
+    def snapshot(self) -> tuple[Graph, PathFinder]:
+        '''
+        Get the current graph and its PathFinder. Node ID:s may change
+        between revisions, so locations should be looked up in the same
+        snapshot that is queried.
+        '''
+        return self._current
+
+    def shortest_path(self, start: int, end: int, **options) -> Route:
+        ''' Calculate the shortest path on the current graph, see PathFinder '''
+        G, path_finder = self._current
+        return path_finder.shortest_path(G, start, end, **options)
+
+    def load(self, filename: str) -> LayoutDiff:
+        '''
+        Parse a new revision of the layout from a JSON file and swap it in.
+        Queries keep running on the current graph while the file is parsed.
+        '''
+        return self.swap(GraphParser().parse_json(filename))
+
+    def swap(self, new: Graph) -> LayoutDiff:
+        '''
+        Replace the graph with a new revision.
+
+        Parameters
+        ----------
+        new: Graph, the new revision of the graph
+
+        Returns
+        ----------
+        diff: LayoutDiff, the differences from the previous revision
+        '''
+        with self._lock:
+            old, path_finder = self._current
+            diff = diff_graphs(old, new)
+            trees = self.__swap_trees(path_finder.trees, new, diff)
+            store = self.__swap_store(path_finder, new, diff)
+            for profile in self.profiles:
+                self.__swap_profile(profile, old, new, diff)
+            if self.artifacts_dir is not None:
+                PreprocessingPipeline(new, self.artifacts_dir,
+                                      self.workers).refresh(diff)
+            self._current = (new, PathFinder(store, trees))
+            self.version += 1
+        return diff
+
+    def close(self):
+        '''
+        Close the distance store of the current revision and the stores of
+        the previous revisions that are still open
+        '''
+        with self._lock:
+            for retired in self._retired_stores:
+                retired()
+            self._retired_stores = []
+            store = self._current[1].store
+            if store is not None:
+                store.close()
+
+    def __swap_trees(self, trees: TreeCache, new: Graph, diff: LayoutDiff) -> TreeCache:
+        ''' Move the unaffected trees to a cache of the new graph '''
+        if trees is None:
+            return None
+        new_trees = TreeCache(new, trees.memory_budget)
+        node_map = diff.node_map
+        for tree in trees.trees():
+            if tree.root not in node_map:
+                continue
+            if diff.affects_tree(tree):
+                new_trees.build(node_map[tree.root], tree.reverse)
+            else:
+                new_trees.add(ShortestPathTree(
+                    node_map[tree.root],
+                    {node_map[n]: d for n, d in tree.dist.items()},
+                    {node_map[n]: None if p is None else node_map[p]
+                     for n, p in tree.pred.items()},
+                    tree.reverse))
+        return new_trees
+
+    def __swap_store(self, path_finder: PathFinder, new: Graph,
+                     diff: LayoutDiff) -> DistanceStore:
+        '''
+        Open the store file for the new graph and copy the routes that are
+        still the shortest ones. The old store stays open for the queries
+        that are still running on the old graph, and is closed when the old
+        PathFinder is garbage collected.
+        '''
+        store = path_finder.store
+        if store is None:
+            return None
+        store.flush()
+        self._retired_stores = [f for f in self._retired_stores if f.alive]
+        self._retired_stores.append(weakref.finalize(path_finder, store.close))
+        new_store = DistanceStore(store.filename, new, store.batch_size)
+        if new_store.graph_hash == store.graph_hash or diff.costs_decreased():
+            # The routes are either already there or may no longer be the
+            # shortest ones
+            return new_store
+        old_ids = {n: o for o, n in diff.node_map.items()}
+        changed = {(f, t) for f, t, _ in diff.removed_edges}
+        changed.update((old_ids[f], old_ids[t]) for f, t, old_edge, new_edge
+                       in diff.changed_edges if new_edge.cost != old_edge.cost)
+
+        def keep(start, end, route):
+            return not any(edge in changed for edge in zip(route.path, route.path[1:]))
+
+        new_store.copy_routes(store.graph_hash, diff.node_map, keep)
+        return new_store
+
+    def __swap_profile(self, profile, old: Graph, new: Graph, diff: LayoutDiff):
+        '''
+        Give the new graph the edge cost multipliers of a profile with the new
+        node ID:s, and keep its edge components for the new graph if the
+        topology is the same
+        '''
+        profile.remap_nodes(old, new, diff.node_map)
+        if diff.topology_changed():
+            return
+        components = profile.cache(old).get('components')
+        if components is not None:
+            profile.cache(new)['components'] = \
+                {diff.node_map[n]: c for n, c in components.items()}
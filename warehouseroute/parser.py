@@ -1,6 +1,11 @@
 import json
-from graph import Edge, Graph, Node, NodeType, Position
+import logging
+from graph import ALL_VEHICLES, Edge, Graph, Node, NodeType, Position
 from location import Location, AreaLocation, RackLocation, DeepStackingLocation
+from validation import GraphValidator, ValidationReport
+
+
+logger = logging.getLogger(__name__)
 
 
 class GraphParser:
@@ -38,10 +43,34 @@ class GraphParser:
                 }
             ]
         }
+
+    An adjacency can have an optional "access" attribute, a bitmask of the
+    vehicle classes that may use the edge. Without it, all vehicle classes
+    may use the edge.
+
+    Graphs with several floors or mezzanines give the floor of each node as
+    an optional "floor" attribute of the position, 0 by default. Edges
+    between floors are marked with a "connector" attribute, e.g. "lift" or
+    "stairs", and can have a "waitTime" attribute that is added to the cost
+    of the edge, e.g. the average waiting time for a lift:
+
+        "adjacencies": [
+            {
+                "nodeTo": 57,
+                "cost": 4.0,
+                "connector": "lift",
+                "waitTime": 30.0
+            }
+        ]
+
+    After parsing, the graph is validated with GraphValidator, which finds
+    broken edges, duplicate locations and the connected components of the
+    graph. The report of the last parsed graph is kept in the report
+    attribute.
     '''
 
     def __init__(self):
-        pass
+        self.report: ValidationReport = None
 
     def __parse_location(self, locationobj: object) -> Location:
         ''' Parse a location object based on its type '''
@@ -66,28 +95,38 @@ class GraphParser:
         ''' Parse an edge object '''
         node_to = edgeobj['nodeTo']
         distance = edgeobj['cost']
-        return (node_to, distance)
+        access = edgeobj.get('access', ALL_VEHICLES)
+        connector = edgeobj.get('connector')
+        # Waiting for a lift is part of the cost of the connector edge
+        distance += edgeobj.get('waitTime', 0.0)
+        return (node_to, distance, access, connector)
 
     def __parse_node(self, nodeobj: object) -> Node:
         ''' Parse a node object '''
         nodeid = nodeobj['id']
         xpos = nodeobj['position']['x']
         ypos = nodeobj['position']['y']
-        position = Position(xpos, ypos)
+        floor = nodeobj['position'].get('floor', 0)
+        position = Position(xpos, ypos, floor)
         location = self.__parse_location(nodeobj['location'])
         node = Node(nodeid, location, position)
         for edgeobj in nodeobj['adjacencies']:
-            node_to, cost = self.__parse_edge(nodeid, edgeobj)
-            node.add_edge(node_to, cost)
+            node_to, cost, access, connector = self.__parse_edge(nodeid, edgeobj)
+            node.add_edge(node_to, cost, access, connector)
         return node
 
-    def parse_json(self, filename: str) -> Graph:
+    def parse_json(self, filename: str, validate: bool = True,
+                   strict: bool = False) -> Graph:
         '''
         Return graph object from graph JSON file
 
         Parameters
         ----------
         filename: str, name of JSON file
+        validate: bool, validate the graph and find its connected components
+        strict: bool, raise a ValueError if the validation finds dangling
+            edges or duplicate locations. Otherwise dangling edges are
+            logged and dropped from the graph.
 
         Returns
         ----------
@@ -127,4 +166,19 @@ class GraphParser:
             for nodeobj in node_list:
                 node: Node = self.__parse_node(nodeobj)
                 G.add_node(node)
+        self.report = None
+        if validate:
+            self.report = GraphValidator().validate(G)
+            if strict and not self.report.is_valid():
+                raise ValueError('Invalid graph in ' + filename + ': ' +
+                                 str(self.report))
+            if self.report.dangling_edges:
+                # Searches would fail with a KeyError at an edge to a
+                # missing node, so the edges are dropped
+                for node_from, node_to in self.report.dangling_edges:
+                    node = G.nodes[node_from]
+                    node.edges = [e for e in node.edges if e.to_node != node_to]
+                logger.warning('Dropped %d dangling edges in %s: %s',
+                               len(self.report.dangling_edges), filename,
+                               self.report.dangling_edges)
         return G
@@ -0,0 +1,218 @@
+import sys
+import threading
+from collections import OrderedDict
+from graph import Graph
+from shortestpath import PathFinder, Route
+
+
+class ShortestPathTree:
+    '''
+    Shortest path tree from or to a root node.
+
+    A forward tree holds the cost from the root to every node it reaches and
+    the previous node on the shortest path from the root. A reverse tree
+    holds the cost to the root from every node that reaches it and the next
+    node on the shortest path to the root. A route between the root and any
+    node in the tree is found by walking up the tree, without a search.
+
+    Attributes
+    ----------
+    root: int, the root node
+    reverse: bool, True for a tree of paths into the root
+    dist: dict, key: node ID, value: cost between the node and the root
+    pred: dict, key: node ID, value: parent node in the tree, None for root
+    '''
+
+    def __init__(self, root: int, dist: dict[int, float], pred: dict[int, int],
+                 reverse: bool = False):
+        self.root = root
+        self.reverse = reverse
+        self.dist = dist
+        self.pred = pred
+
+    def __str__(self):
+        return ('reverse' if self.reverse else 'forward') + ' tree ' + \
+            str(self.root) + ' nodes ' + str(len(self.dist))
+
+    def route(self, node: int) -> Route:
+        '''
+        Get the shortest route between the root and a node, from the root for
+        a forward tree and to the root for a reverse tree.
+
+        Parameters
+        ----------
+        node: int, the node ID
+
+        Returns
+        ----------
+        route: Route, the shortest route, or None if the node is not in the
+            tree
+        '''
+        if node not in self.dist:
+            return None
+        path = [node]
+        while self.pred[path[-1]] is not None:
+            path.append(self.pred[path[-1]])
+        if not self.reverse:
+            path.reverse()
+        return Route(path, self.dist[node])
+
+    def arrays(self) -> tuple[list[int], list[float], list[int]]:
+        '''
+        Export the tree as arrays of equal length.
+
+        Returns
+        ----------
+        node_ids: list of int, the node ID:s in the tree
+        dist: list of float, the cost between each node and the root
+        pred: list of int, the index of the parent of each node in node_ids,
+            -1 for the root
+        '''
+        node_ids = list(self.dist)
+        index = {nodeid: i for i, nodeid in enumerate(node_ids)}
+        dist = [self.dist[nodeid] for nodeid in node_ids]
+        pred = [-1 if self.pred[nodeid] is None else index[self.pred[nodeid]]
+                for nodeid in node_ids]
+        return node_ids, dist, pred
+
+    def nbytes(self) -> int:
+        ''' Get an estimate of the memory used by the tree in bytes '''
+        # The dicts plus one float object per distance, node ID:s are mostly
+        # shared with the graph
+        return sys.getsizeof(self.dist) + sys.getsizeof(self.pred) + \
+            len(self.dist) * sys.getsizeof(0.0)
+
+
+class TreeCache:
+    '''
+    Cache of shortest path trees of a graph, within a memory budget.
+
+    Trees are built for nodes that many queries start from, e.g. depots,
+    charging stations and outbound gates, as forward trees, and for nodes
+    that many queries end at as reverse trees. When the trees use more
+    memory than the budget, the least recently used trees are evicted.
+
+    A PathFinder that is given the cache answers queries from or to the root
+    of a cached tree by walking up the tree. When the graph is changed
+    through its methods, e.g. Graph.set_edge_cost, the cached trees are
+    dropped at the next lookup, since they may no longer be shortest path
+    trees.
+
+    Attributes
+    ----------
+    graph: Graph, the graph that the trees are built for
+    memory_budget: int, the maximum estimated memory of the trees in bytes
+    nbytes: int, the estimated memory of the cached trees in bytes
+    '''
+
+    def __init__(self, G: Graph, memory_budget: int = 64 * 1024 * 1024):
+        self.graph = G
+        self.memory_budget = memory_budget
+        self.nbytes = 0
+        self._trees = OrderedDict()
+        self._revision = G.revision
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._trees)
+
+    def build(self, root: int, reverse: bool = False) -> ShortestPathTree:
+        '''
+        Build the shortest path tree from (or to) a node and add it to the
+        cache, evicting the least recently used trees if needed. A tree that
+        is larger than the whole budget is returned but not cached.
+
+        Parameters
+        ----------
+        root: int, the root node
+        reverse: bool, build the tree of paths into the root
+
+        Returns
+        ----------
+        tree: ShortestPathTree, the new tree
+        '''
+        dist, pred = PathFinder().shortest_path_tree(self.graph, root, reverse)
+        tree = ShortestPathTree(root, dist, pred, reverse)
+        self.add(tree)
+        return tree
+
+    def add(self, tree: ShortestPathTree):
+        '''
+        Add a tree of the graph to the cache, evicting the least recently used
+        trees if needed. A tree that is larger than the whole budget is not
+        cached.
+        '''
+        size = tree.nbytes()
+        key = (tree.root, tree.reverse)
+        with self._lock:
+            self.__check_revision()
+            self.__remove(key)
+            if size <= self.memory_budget:
+                while self._trees and self.nbytes + size > self.memory_budget:
+                    self.__remove(next(iter(self._trees)))
+                self._trees[key] = (tree, size)
+                self.nbytes += size
+
+    def get(self, root: int, reverse: bool = False) -> ShortestPathTree:
+        ''' Get a cached tree, or None if it is not cached '''
+        with self._lock:
+            self.__check_revision()
+            entry = self._trees.get((root, reverse))
+            if entry is None:
+                return None
+            self._trees.move_to_end((root, reverse))
+            return entry[0]
+
+    def lookup(self, start: int, end: int) -> tuple[bool, Route]:
+        '''
+        Get the shortest route from a cached forward tree from the start node
+        or a cached reverse tree to the end node.
+
+        Parameters
+        ----------
+        start: int, the start node
+        end: int, the end node
+
+        Returns
+        ----------
+        found: bool, True if a cached tree covers the query
+        route: Route, the shortest route, or None if found is False or if
+            there is no path
+        '''
+        tree = self.get(start)
+        if tree is not None:
+            return True, tree.route(end)
+        tree = self.get(end, reverse=True)
+        if tree is not None:
+            return True, tree.route(start)
+        return False, None
+
+    def trees(self) -> list[ShortestPathTree]:
+        ''' Get the cached trees, the least recently used first '''
+        with self._lock:
+            self.__check_revision()
+            return [tree for tree, _ in self._trees.values()]
+
+    def evict(self, root: int, reverse: bool = False):
+        ''' Remove a tree from the cache '''
+        with self._lock:
+            self.__remove((root, reverse))
+
+    def clear(self):
+        ''' Remove all trees from the cache '''
+        with self._lock:
+            self._trees.clear()
+            self.nbytes = 0
+
+    def __check_revision(self):
+        ''' Drop the trees if the graph has changed, lock must be held '''
+        if self.graph.revision != self._revision:
+            self._trees.clear()
+            self.nbytes = 0
+            self._revision = self.graph.revision
+
+    def __remove(self, key: tuple[int, bool]):
+        ''' Remove a tree if it is cached, lock must be held '''
+        entry = self._trees.pop(key, None)
+        if entry is not None:
+            self.nbytes -= entry[1]
@@ -0,0 +1,327 @@
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from time import perf_counter
+import numpy as np
+from graph import Graph
+from grapharrays import GraphArrays
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows, memory high-water marks are then not reported
+    resource = None
+
+
+_worker_arrays = None
+
+
+def _attach_worker(descriptor: dict):
+    ''' Open the shared graph arrays once in every worker process '''
+    global _worker_arrays
+    _worker_arrays = GraphArrays.attach(descriptor)
+
+
+def _dijkstra_in_worker(source: int, reverse: bool) -> np.ndarray:
+    ''' Run Dijkstra's algorithm on the shared graph arrays '''
+    return _worker_arrays.dijkstra(source, reverse)
+
+
+def _max_rss(children: bool = False) -> int:
+    '''
+    Peak resident set size in bytes of this process, or of the largest
+    finished child process, 0 if it cannot be measured
+    '''
+    if resource is None:
+        return 0
+    who = resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(who).ru_maxrss * 1024
+
+
+class StageReport:
+    '''
+    Timing and memory of a preprocessing stage.
+
+    Attributes
+    ----------
+    name: str, the name of the stage
+    seconds: float, the wall clock time of the stage
+    peak_memory: int, the peak resident memory of this process so far in
+        bytes
+    peak_worker_memory: int, the peak resident memory of any finished worker
+        process so far in bytes
+    artifacts: list of str, the files written by the stage
+    '''
+
+    def __init__(self, name: str, seconds: float, peak_memory: int,
+                 peak_worker_memory: int, artifacts: list[str]):
+        self.name = name
+        self.seconds = seconds
+        self.peak_memory = peak_memory
+        self.peak_worker_memory = peak_worker_memory
+        self.artifacts = artifacts
+
+    def __str__(self):
+        return '{} {:.2f} s peak memory {:.1f} MB workers {:.1f} MB'.format(
+            self.name, self.seconds, self.peak_memory / 2**20,
+            self.peak_worker_memory / 2**20)
+
+
+class PreprocessingPipeline:
+    '''
+    Pipeline that precomputes data structures for a graph in parallel.
+
+    The graph is converted to GraphArrays once and copied to shared memory,
+    and the stages that search the graph run their searches in a pool of
+    worker processes that attach to the shared arrays instead of receiving a
+    copy of the graph. The components stage is vectorized over all edges
+    with NumPy instead. The results of every stage are written as NumPy
+    files to a subdirectory of the output directory, and a manifest.json
+    file records the content hash of the graph, so that stale artifacts can
+    be detected, and the timing and memory high-water marks of every stage.
+
+    The stages are:
+
+    - components: weakly connected component ID of every node
+    - landmarks: distances from and to a set of landmark nodes, which give
+      lower bounds of the distance between any two nodes (ALT)
+    - distances: distance matrix between a given set of source nodes
+
+    Attributes
+    ----------
+    G: Graph, the graph structure of warehouse locations
+    output_dir: str, the directory the artifacts are written to
+    workers: int, the number of worker processes, None for one per CPU
+    '''
+
+    STAGES = ['components', 'landmarks', 'distances']
+
+    def __init__(self, G: Graph, output_dir: str, workers: int = None):
+        self.G = G
+        self.output_dir = output_dir
+        self.workers = workers
+
+    def run(self, stages: list[str] = None, landmarks: int = 8,
+            sources: list[int] = None) -> list[StageReport]:
+        '''
+        Run preprocessing stages and write their artifacts.
+
+        Parameters
+        ----------
+        stages: list of str, the stages to run, by default all stages, except
+            distances if no sources are given
+        landmarks: int, the number of landmarks
+        sources: list of int, node ID:s of the distance matrix
+
+        Returns
+        ----------
+        reports: list of StageReport, one per stage
+        '''
+        if stages is None:
+            stages = [s for s in self.STAGES if s != 'distances' or sources]
+        for stage in stages:
+            if stage not in self.STAGES:
+                raise ValueError('Invalid preprocessing stage ' + str(stage))
+        os.makedirs(self.output_dir, exist_ok=True)
+
+        reports = []
+        started = perf_counter()
+        arrays = GraphArrays.from_graph(self.G)
+        self.__save('arrays', {name: getattr(arrays, name)
+                               for name in GraphArrays.ARRAYS})
+        reports.append(self.__report('arrays', started, ['arrays']))
+
+        descriptor = arrays.to_shared()
+        try:
+            for stage in stages:
+                started = perf_counter()
+                if stage == 'components':
+                    results = {'components': self.__components(arrays)}
+                else:
+                    # A pool per stage, so that the memory of its workers is
+                    # measured when they exit at the end of the stage
+                    with ProcessPoolExecutor(self.workers,
+                                             initializer=_attach_worker,
+                                             initargs=(descriptor,)) as pool:
+                        if stage == 'landmarks':
+                            results = self.__landmarks(arrays, pool, landmarks)
+                        else:
+                            results = self.__distances(arrays, pool, sources)
+                self.__save(stage, results)
+                reports.append(self.__report(stage, started, [stage]))
+        finally:
+            arrays.release(unlink=True)
+
+        self.__write_manifest(reports)
+        return reports
+
+    def refresh(self, diff, landmarks: int = None,
+                sources: list[int] = None) -> list[StageReport]:
+        '''
+        Update the artifacts of the previous revision of the graph in the
+        output directory to this graph, running only the stages that the
+        layout diff touches.
+
+        The artifacts are indexed by node, so all stages run again if nodes
+        were added, removed or renumbered. Otherwise the arrays are always
+        written again, the components only if edges were added or removed
+        or their access changed, and the landmarks and distances if any edge
+        changed. Moved nodes change only the arrays, since the old landmarks
+        still give lower bounds of the distances.
+
+        Parameters
+        ----------
+        diff: LayoutDiff, the differences from the previous revision
+        landmarks: int, the number of landmarks, by default the previous
+            number
+        sources: list of int, node ID:s of the distance matrix, by default
+            the previous sources that are still in the graph
+
+        Returns
+        ----------
+        reports: list of StageReport, one per stage that was run
+        '''
+        try:
+            with open(os.path.join(self.output_dir, 'manifest.json')) as mfile:
+                previous = json.load(mfile)['stages']
+        except FileNotFoundError:
+            return self.run(landmarks=landmarks or 8, sources=sources)
+        names = [stage['name'] for stage in previous if stage['name'] != 'arrays']
+        if landmarks is None:
+            landmarks = len(np.load(os.path.join(
+                self.output_dir, 'landmarks', 'landmarks.npy'))) \
+                if 'landmarks' in names else 8
+        if sources is None and 'distances' in names:
+            old_sources = np.load(os.path.join(self.output_dir, 'distances',
+                                               'sources.npy'))
+            sources = [diff.node_map[int(n)] for n in old_sources
+                       if int(n) in diff.node_map]
+        if not sources:
+            # No sources are left, e.g. all of them were removed
+            names = [name for name in names if name != 'distances']
+
+        if diff.added or diff.removed or diff.renumbered():
+            stale = names
+        else:
+            stale = []
+            for name in names:
+                if name == 'components':
+                    changed = diff.topology_changed()
+                else:
+                    changed = diff.edges_changed()
+                if changed:
+                    stale.append(name)
+        reports = self.run(stages=stale, landmarks=landmarks, sources=sources)
+        kept = [stage for stage in previous if stage['name'] in names and
+                stage['name'] not in stale]
+        self.__write_manifest(reports, kept)
+        return reports
+
+    def __components(self, arrays: GraphArrays) -> np.ndarray:
+        '''
+        Weakly connected components by label propagation, where every node
+        repeatedly takes the smallest label among its neighbours. Each
+        iteration is a few vectorized operations over all edges.
+        '''
+        labels = np.arange(len(arrays))
+        rows = np.repeat(np.arange(len(arrays)), np.diff(arrays.indptr))
+        cols = arrays.indices
+        while True:
+            previous = labels.copy()
+            smallest = np.minimum(labels[rows], labels[cols])
+            np.minimum.at(labels, rows, smallest)
+            np.minimum.at(labels, cols, smallest)
+            # Jump to the label of the label to speed up long paths
+            labels = labels[labels]
+            if np.array_equal(labels, previous):
+                break
+        # Renumber the components 0, 1, 2, ...
+        return np.unique(labels, return_inverse=True)[1]
+
+    def __landmarks(self, arrays: GraphArrays, pool: ProcessPoolExecutor,
+                    count: int) -> dict[str, np.ndarray]:
+        '''
+        Choose landmarks spread over the layout with farthest point sampling
+        on the node coordinates, and compute the distances from and to every
+        landmark in parallel.
+        '''
+        count = min(count, len(arrays))
+        if count == 0:
+            return {'landmarks': np.zeros(0, dtype=np.int64)}
+        points = np.column_stack([arrays.x, arrays.y, arrays.floor])
+        chosen = [int(np.argmax(np.linalg.norm(points - points.mean(axis=0), axis=1)))]
+        nearest = np.linalg.norm(points - points[chosen[0]], axis=1)
+        while len(chosen) < count:
+            chosen.append(int(nearest.argmax()))
+            nearest = np.minimum(nearest, np.linalg.norm(points - points[chosen[-1]], axis=1))
+        forward = pool.map(_dijkstra_in_worker, chosen, [False] * count)
+        reverse = pool.map(_dijkstra_in_worker, chosen, [True] * count)
+        return {'landmarks': arrays.node_ids[chosen],
+                'from_landmark': np.vstack(list(forward)),
+                'to_landmark': np.vstack(list(reverse))}
+
+    def __distances(self, arrays: GraphArrays, pool: ProcessPoolExecutor,
+                    sources: list[int]) -> dict[str, np.ndarray]:
+        ''' Distance matrix between the sources, one Dijkstra per source '''
+        if not sources:
+            raise ValueError('The distances stage needs source nodes')
+        indices = [arrays.index[nodeid] for nodeid in sources]
+        rows = pool.map(_dijkstra_in_worker, indices, [False] * len(indices))
+        return {'sources': np.array(sources, dtype=np.int64),
+                'distances': np.vstack([row[indices] for row in rows])}
+
+    def __save(self, stage: str, results: dict[str, np.ndarray]):
+        ''' Write the arrays of a stage to its subdirectory '''
+        directory = os.path.join(self.output_dir, stage)
+        os.makedirs(directory, exist_ok=True)
+        for name, array in results.items():
+            np.save(os.path.join(directory, name + '.npy'), array)
+
+    def __report(self, stage: str, started: float, artifacts: list[str]) -> StageReport:
+        ''' Measure a finished stage '''
+        return StageReport(stage, perf_counter() - started, _max_rss(),
+                           _max_rss(children=True),
+                           [os.path.join(self.output_dir, a) for a in artifacts])
+
+    def __write_manifest(self, reports: list[StageReport], kept: list[dict] = ()):
+        '''
+        Write the graph hash and stage reports to manifest.json, together
+        with the manifest entries of stages kept from a previous run
+        '''
+        manifest = {
+            'graph_hash': self.G.content_hash(),
+            'stages': [{'name': r.name, 'seconds': r.seconds,
+                        'peak_memory': r.peak_memory,
+                        'peak_worker_memory': r.peak_worker_memory}
+                       for r in reports] + list(kept),
+        }
+        with open(os.path.join(self.output_dir, 'manifest.json'), 'w') as mfile:
+            json.dump(manifest, mfile, indent=2)
+
+
+def load_artifacts(output_dir: str, G: Graph = None) -> dict[str, dict[str, np.ndarray]]:
+    '''
+    Load the artifacts written by PreprocessingPipeline.
+
+    Parameters
+    ----------
+    output_dir: str, the output directory of the pipeline
+    G: Graph, if given, the artifacts must have been computed for a graph
+        with the same content, otherwise a ValueError is raised
+
+    Returns
+    ----------
+    artifacts: dict, key: stage name, value: dict of arrays by name
+    '''
+    with open(os.path.join(output_dir, 'manifest.json')) as mfile:
+        manifest = json.load(mfile)
+    if G is not None and manifest['graph_hash'] != G.content_hash():
+        raise ValueError('Artifacts in ' + output_dir + ' are for another graph')
+    artifacts = {}
+    for stage in manifest['stages']:
+        directory = os.path.join(output_dir, stage['name'])
+        artifacts[stage['name']] = {
+            name[:-len('.npy')]: np.load(os.path.join(directory, name))
+            for name in sorted(os.listdir(directory)) if name.endswith('.npy')}
+    return artifacts
@@ -0,0 +1,204 @@
+from enum import IntFlag
+from weakref import WeakKeyDictionary
+from graph import Edge, Graph
+from validation import weak_components
+
+
+class VehicleClass(IntFlag):
+    '''
+    Vehicle classes, each a bit in the access bitmask of the edges. Sites
+    with other vehicles can use any other single-bit values.
+    '''
+    REACH_TRUCK = 1
+    PALLET_JACK = 2
+    PICKER = 4
+
+
+def restrict_edges(G: Graph, vehicle_classes: int, predicate) -> int:
+    '''
+    Forbid vehicle classes to use the edges that match a predicate, e.g. the
+    edges into DeepStackingLocation lanes.
+
+    Parameters
+    ----------
+    G: Graph, the graph structure of warehouse locations
+    vehicle_classes: int, bitmask of the vehicle classes to forbid
+    predicate: function taking the from-node ID and the Edge, returning
+        True for edges that the vehicle classes may not use
+
+    Returns
+    ----------
+    count: int, the number of matching edges
+    '''
+    count = 0
+    for nodeid, node in G.nodes.items():
+        for edge in node.edges:
+            if predicate(nodeid, edge):
+                edge.access &= ~vehicle_classes
+                count += 1
+    return count
+
+
+class RoutingProfile:
+    '''
+    Routing profile of a vehicle class.
+
+    A profile may only use the edges whose access bitmask contains its
+    vehicle class, and scales the edge costs by its cost multiplier. Edges
+    that are slower or faster for the vehicle class than its default can
+    have their own multiplier. The masks are stored on the edges of the
+    graph and the multipliers on the profile, so switching between profiles
+    does not copy the graph. The multipliers are keyed by node ID, so a
+    graph whose node ID:s differ, e.g. a new revision of the layout, gets
+    its own multipliers with remap_nodes, and the other graphs keep theirs.
+
+    Structures that depend on both the graph and the profile, i.e. the
+    connected components of the edges the profile may use and a cache for
+    other precomputed data, are built the first time they are needed for a
+    graph and kept until the graph is garbage collected or invalidate is
+    called.
+
+    Attributes
+    ----------
+    name: str, name of the profile
+    vehicle_class: int, the access bit of the vehicle class
+    multiplier: float, the default cost multiplier
+    min_multiplier: float, the smallest cost multiplier of any edge in any
+        graph
+    '''
+
+    def __init__(self, name: str, vehicle_class: int, multiplier: float = 1.0,
+                 edge_multipliers: dict[tuple[int, int], float] = None):
+        '''
+        Constructor
+
+        Parameters
+        ----------
+        name: str, name of the profile
+        vehicle_class: int, the access bit of the vehicle class
+        multiplier: float, the default cost multiplier
+        edge_multipliers: dict, key: (from, to) node ID:s, value: the cost
+            multiplier of the edge if it differs from the default
+        '''
+        self.name = name
+        self.vehicle_class = vehicle_class
+        self.multiplier = multiplier
+        self._edge_multipliers = dict(edge_multipliers or {})
+        self.min_multiplier = min([multiplier, *self._edge_multipliers.values()])
+        self._graph_data = WeakKeyDictionary()
+        self._graph_multipliers = WeakKeyDictionary()
+
+    def __str__(self):
+        return 'profile ' + self.name
+
+    def set_edge_multiplier(self, node_from: int, node_to: int, multiplier: float,
+                            G: Graph = None):
+        '''
+        Set the cost multiplier of the edge from node_from to node_to, in the
+        multipliers of G if given, see edge_multipliers
+        '''
+        self.edge_multipliers(G)[(node_from, node_to)] = multiplier
+        self.min_multiplier = min(self.min_multiplier, multiplier)
+
+    def edge_multipliers(self, G: Graph = None) -> dict[tuple[int, int], float]:
+        '''
+        Get the edge cost multipliers of a graph, which are the multipliers
+        given to the constructor unless remap_nodes has given the graph its
+        own, or the multipliers given to the constructor if G is None.
+
+        Returns
+        ----------
+        multipliers: dict, key: (from, to) node ID:s, value: the cost
+            multiplier of the edge
+        '''
+        if G is None:
+            return self._edge_multipliers
+        return self._graph_multipliers.get(G, self._edge_multipliers)
+
+    def remap_nodes(self, old: Graph, new: Graph, node_map: dict[int, int]):
+        '''
+        Give a new revision of the layout its own edge cost multipliers,
+        copied from the multipliers of the old graph with the new node ID:s.
+        The multipliers of edges from or to nodes that are not in the map are
+        dropped. The multipliers of the old graph are not changed, so queries
+        on the old graph are not affected.
+
+        Parameters
+        ----------
+        old: Graph, the graph to copy the multipliers from
+        new: Graph, the graph to give the multipliers to
+        node_map: dict, key: old node ID, value: new node ID
+        '''
+        self._graph_multipliers[new] = {
+            (node_map[f], node_map[t]): m
+            for (f, t), m in self.edge_multipliers(old).items()
+            if f in node_map and t in node_map}
+
+    def edge_cost(self, node_from: int, edge: Edge, G: Graph = None) -> float:
+        '''
+        Get the cost of an edge for the profile.
+
+        Parameters
+        ----------
+        node_from: int, the from-node ID
+        edge: Edge, the edge
+        G: Graph, the graph of the edge, see edge_multipliers
+
+        Returns
+        ----------
+        cost: float, the scaled edge cost, or None if the profile may not use
+            the edge
+        '''
+        return self.edge_costs(G)(node_from, edge)
+
+    def edge_costs(self, G: Graph = None):
+        '''
+        Get a function giving the cost of an edge of a graph for the profile,
+        which looks up the multipliers of the graph once instead of for every
+        edge, see edge_cost
+        '''
+        multipliers = self.edge_multipliers(G)
+        vehicle_class, default = self.vehicle_class, self.multiplier
+
+        def cost(node_from: int, edge: Edge) -> float:
+            if not edge.access & vehicle_class:
+                return None
+            return edge.cost * multipliers.get((node_from, edge.to_node), default)
+        return cost
+
+    def components(self, G: Graph) -> dict[int, int]:
+        '''
+        Get the weakly connected components of the edges that the profile may
+        use. Nodes in different components cannot reach each other.
+
+        Returns
+        ----------
+        components: dict, key: node ID, value: component ID
+        '''
+        data = self.cache(G)
+        if 'components' not in data:
+            data['components'] = weak_components(
+                G, lambda edge: edge.access & self.vehicle_class)
+        return data['components']
+
+    def cache(self, G: Graph) -> dict:
+        '''
+        Get the cache of precomputed data for the profile on a graph, which is
+        created empty the first time it is requested, and again after the
+        graph has been changed through its methods.
+        '''
+        data = self._graph_data.get(G)
+        if data is None or data['revision'] != G.revision:
+            data = {'revision': G.revision}
+            self._graph_data[G] = data
+        return data
+
+    def invalidate(self, G: Graph = None):
+        '''
+        Drop the precomputed data for a graph, e.g. after its edges or access
+        masks have changed, or for all graphs if G is None.
+        '''
+        if G is None:
+            self._graph_data.clear()
+        else:
+            self._graph_data.pop(G, None)
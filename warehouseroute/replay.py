@@ -0,0 +1,276 @@
+import argparse
+import gzip
+import importlib
+import json
+import sys
+import threading
+from math import isclose
+from time import perf_counter
+from weakref import WeakKeyDictionary
+from distancestore import DistanceStore
+from graph import Graph
+from parser import GraphParser
+from pathtree import TreeCache
+from shortestpath import PathFinder, Route
+from vectorsearch import VectorizedPathFinder
+
+
+class RecordingPathFinder(PathFinder):
+    '''
+    PathFinder that records its queries to a file.
+
+    Every call to shortest_path without early termination options or profile
+    is recorded with the start and end location names, the node ID:s, the
+    cost and path of the result, and the latency of the call. The records
+    are written as gzip-compressed JSON lines, which replay reads to check
+    other engines against the recorded results.
+
+    Attributes
+    ----------
+    filename: str, the name of the record file
+    '''
+
+    def __init__(self, filename: str, store=None, trees=None):
+        super().__init__(store, trees)
+        self.filename = filename
+        self._file = gzip.open(filename, 'at')
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def shortest_path(self, G: Graph, start: int, end: int,
+                      max_cost: float = None, max_expansions: int = None,
+                      weight: float = 1.0, profile=None) -> Route:
+        ''' Calculate and record the shortest path, see PathFinder '''
+        started = perf_counter()
+        route = super().shortest_path(G, start, end, max_cost, max_expansions,
+                                      weight, profile)
+        seconds = perf_counter() - started
+        if max_cost is None and max_expansions is None and weight == 1.0 \
+                and profile is None:
+            record = {
+                'start': str(G.nodes[start].location),
+                'end': str(G.nodes[end].location),
+                'start_id': start,
+                'end_id': end,
+                'cost': None if route is None else route.cost,
+                'path': None if route is None else route.path,
+                'seconds': seconds,
+            }
+            with self._lock:
+                self._file.write(json.dumps(record) + '\n')
+        return route
+
+    def close(self):
+        ''' Close the record file '''
+        with self._lock:
+            self._file.close()
+
+
+def read_records(filename: str):
+    ''' Read the records of a record file one at a time '''
+    with gzip.open(filename, 'rt') as rfile:
+        for line in rfile:
+            if line.strip():
+                yield json.loads(line)
+
+
+def percentile(values: list[float], p: float) -> float:
+    ''' Get the p:th percentile of values, nearest rank method '''
+    if not values:
+        return float('nan')
+    ordered = sorted(values)
+    rank = max(int(-(-p * len(ordered) // 100)) - 1, 0)
+    return ordered[min(rank, len(ordered) - 1)]
+
+
+class ReplayReport:
+    '''
+    Comparison of a replayed engine with the recorded results.
+
+    Attributes
+    ----------
+    queries: int, the number of replayed queries
+    skipped: int, the number of records whose locations are not in the graph
+    cost_mismatches: list of dicts, records where the costs differ, with the
+        replayed cost added
+    path_differences: int, the number of queries with equal cost but a
+        different path, compared by node ID
+    recorded_seconds: list of float, the recorded latencies
+    replayed_seconds: list of float, the replayed latencies
+    '''
+
+    def __init__(self):
+        self.queries = 0
+        self.skipped = 0
+        self.cost_mismatches = []
+        self.path_differences = 0
+        self.recorded_seconds = []
+        self.replayed_seconds = []
+
+    def latency_ratio(self, p: float = 50) -> float:
+        ''' Replayed latency divided by recorded latency at a percentile '''
+        recorded = percentile(self.recorded_seconds, p)
+        return percentile(self.replayed_seconds, p) / recorded if recorded else float('nan')
+
+    def __str__(self):
+        lines = ['queries {} skipped {} cost mismatches {} path differences {}'.format(
+            self.queries, self.skipped, len(self.cost_mismatches),
+            self.path_differences),
+            '{:>10} {:>12} {:>12}'.format('latency', 'recorded ms', 'replayed ms')]
+        for p in [50, 90, 99, 100]:
+            lines.append('{:>10} {:>12.3f} {:>12.3f}'.format(
+                'p' + str(p), 1000 * percentile(self.recorded_seconds, p),
+                1000 * percentile(self.replayed_seconds, p)))
+        return '\n'.join(lines)
+
+
+def replay(filename: str, G: Graph, engine, tolerance: float = 1e-6) -> ReplayReport:
+    '''
+    Replay recorded queries against an engine.
+
+    The queries are matched to the graph by location name, so a record file
+    can be replayed against a graph where the node ID:s have changed.
+
+    Parameters
+    ----------
+    filename: str, the name of the record file
+    G: Graph, the graph structure of warehouse locations
+    engine: function taking the graph, start node and end node, returning a
+        Route or None
+    tolerance: float, the relative cost difference that is still a match
+
+    Returns
+    ----------
+    report: ReplayReport, the comparison with the recorded results
+    '''
+    node_ids = {str(node.location): nodeid for nodeid, node in G.nodes.items()}
+    report = ReplayReport()
+    for record in read_records(filename):
+        start = node_ids.get(record['start'])
+        end = node_ids.get(record['end'])
+        if start is None or end is None:
+            report.skipped += 1
+            continue
+        started = perf_counter()
+        route = engine(G, start, end)
+        report.replayed_seconds.append(perf_counter() - started)
+        report.recorded_seconds.append(record['seconds'])
+        report.queries += 1
+
+        cost = None if route is None else route.cost
+        if cost is None or record['cost'] is None:
+            matches = cost is None and record['cost'] is None
+        else:
+            matches = isclose(cost, record['cost'], rel_tol=tolerance,
+                              abs_tol=tolerance)
+        if not matches:
+            report.cost_mismatches.append(dict(record, replayed_cost=cost))
+        elif route is not None and route.path != record['path']:
+            report.path_differences += 1
+    return report
+
+
+def _per_graph(factory):
+    '''
+    Make an engine from a factory that prepares a function taking the start
+    and end node for a graph, which is called once per graph
+    '''
+    prepared = WeakKeyDictionary()
+
+    def engine(G: Graph, start: int, end: int) -> Route:
+        if G not in prepared:
+            prepared[G] = factory(G)
+        return prepared[G](start, end)
+    return engine
+
+
+def _tree_engine(G: Graph):
+    ''' PathFinder that builds a shortest path tree from every new start node '''
+    trees = TreeCache(G)
+    path_finder = PathFinder(trees=trees)
+
+    def shortest_path(start: int, end: int) -> Route:
+        if trees.get(start) is None and trees.get(end, reverse=True) is None:
+            trees.build(start)
+        return path_finder.shortest_path(G, start, end)
+    return shortest_path
+
+
+def _store_engine(G: Graph):
+    ''' PathFinder with a DistanceStore in memory, so repeated queries are looked up '''
+    path_finder = PathFinder(store=DistanceStore(':memory:', G))
+    return lambda start, end: path_finder.shortest_path(G, start, end)
+
+
+# Engines that the replay command can run, by name
+ENGINES = {
+    'astar': lambda G, start, end: PathFinder().shortest_path(G, start, end),
+    'weighted': lambda G, start, end: PathFinder().shortest_path(G, start, end, weight=1.5),
+    'vectorized': _per_graph(lambda G: VectorizedPathFinder(G).shortest_path),
+    'trees': _per_graph(_tree_engine),
+    'store': _per_graph(_store_engine),
+}
+
+
+def get_engine(name: str):
+    '''
+    Get an engine by its name in ENGINES, or as module:callable for any
+    function taking the graph, start node and end node, returning a Route or
+    None, e.g. mypackage.engines:shortest_path.
+    '''
+    if name in ENGINES:
+        return ENGINES[name]
+    module_name, _, attribute = name.partition(':')
+    if not attribute:
+        raise ValueError('Unknown engine ' + name + ', expected one of ' +
+                         ', '.join(sorted(ENGINES)) + ' or module:callable')
+    engine = getattr(importlib.import_module(module_name), attribute)
+    if not callable(engine):
+        raise ValueError(name + ' is not callable')
+    return engine
+
+
+def main(argv: list[str] = None) -> int:
+    ''' Command line entry point, returns 1 if the performance gate fails '''
+    arg_parser = argparse.ArgumentParser(
+        description='Replay recorded shortest path queries and compare the results.')
+    arg_parser.add_argument('graphfile', type=str, help='graph JSON file')
+    arg_parser.add_argument('recordfile', type=str, help='gzip JSONL record file')
+    arg_parser.add_argument('-e', '--engine', default='astar',
+                            help='engine to replay against, one of ' +
+                            ', '.join(sorted(ENGINES)) + ' or module:callable')
+    arg_parser.add_argument('--max-mismatches', type=int, default=None,
+                            help='fail if there are more cost mismatches')
+    arg_parser.add_argument('--max-latency-ratio', type=float, default=None,
+                            help='fail if the median latency grows by more than this factor')
+    args = arg_parser.parse_args(argv)
+
+    try:
+        engine = get_engine(args.engine)
+    except (ImportError, AttributeError, ValueError) as error:
+        arg_parser.error(str(error))
+    G = GraphParser().parse_json(args.graphfile)
+    report = replay(args.recordfile, G, engine)
+    print(report)
+
+    failed = False
+    if args.max_mismatches is not None and \
+            len(report.cost_mismatches) > args.max_mismatches:
+        print('FAIL: {} cost mismatches'.format(len(report.cost_mismatches)),
+              file=sys.stderr)
+        failed = True
+    if args.max_latency_ratio is not None and \
+            report.latency_ratio() > args.max_latency_ratio:
+        print('FAIL: median latency ratio {:.2f}'.format(report.latency_ratio()),
+              file=sys.stderr)
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,4 +1,6 @@
 from heapq import heappush, heappop
+from math import inf
+from time import perf_counter
 from graph import Graph
 
 
@@ -27,10 +29,27 @@ class PathFinder:
     Currently, PathFinder only contains the A* algorithm and takes a Graph as
     input, but this could be extended with other path finding algorithms and
     other inputs like grids.
+
+    Optionally, a PathFinder can be given a store of precomputed routes, e.g.
+    a DistanceStore. shortest_path then looks up the route in the store
+    before searching and adds the routes it finds to the store. It can also
+    be given a TreeCache of shortest path trees, which answers queries from
+    or to the roots of the cached trees without searching. The store and
+    the tree cache are only used for the graph they were created for.
+
+    Edges with an infinite cost, e.g. blocked aisles, are treated as missing
+    by all searches.
+
+    Attributes
+    ----------
+    store: object with get(start, end) and put(start, end, route) methods
+        and a graph attribute, or None
+    trees: TreeCache, or None
     '''
 
-    def __init__(self):
-        pass
+    def __init__(self, store=None, trees=None):
+        self.store = store
+        self.trees = trees
 
     def reverse_path(self, came_from: dict[int, int], start: int, end: int) -> list[int]:
         '''
@@ -58,7 +77,9 @@ class PathFinder:
         path.reverse()
         return path
 
-    def shortest_path(self, G: Graph, start: int, end: int) -> Route:
+    def shortest_path(self, G: Graph, start: int, end: int,
+                      max_cost: float = None, max_expansions: int = None,
+                      weight: float = 1.0, profile=None) -> Route:
         '''
         Calculate the shortest path using the A* algorithm
 
@@ -80,16 +101,72 @@ class PathFinder:
         forklift in a warehouse, the number of turns has a significant impact
         on the travel time and should be used to break ties.
 
+        The search can be stopped early. With max_cost, nodes whose estimated
+        total cost exceeds max_cost are never added to the frontier, so a
+        search for an end node that is further away than max_cost only
+        expands the nodes within that cost. With max_expansions, the search
+        gives up after expanding that many nodes. With a weight above 1, the
+        heuristic is multiplied by the weight (weighted A*), which expands
+        fewer nodes and returns a route that costs at most weight times the
+        cost of the shortest route. If the graph has been validated by
+        GraphValidator, a query between nodes in different weakly connected
+        components returns None without searching.
+
+        With a RoutingProfile, the search only uses the edges that the
+        profile's vehicle class may use, with the profile's edge costs. The
+        heuristic is scaled by the smallest cost multiplier of the profile to
+        stay admissible.
+
         Parameters
         ----------
         G: Graph, the graph structure of warehouse locations
         start: int, the start node
         end: int, the end node
+        max_cost: float, the maximum cost of the route, None for no limit
+        max_expansions: int, the maximum number of expanded nodes, None for
+            no limit
+        weight: float, the heuristic weight, at least 1
+        profile: RoutingProfile, the vehicle routing profile, None to use all
+            edges with their costs
 
         Returns
         ----------
-        path: Route, object holding the path and the cost of the path
+        path: Route, object holding the path and the cost of the path, or
+            None if there is no path within the limits
         '''
+        if weight < 1.0:
+            raise ValueError('Heuristic weight must be at least 1')
+        if self.__different_components(G, start, end):
+            # The nodes are in different components of the validated graph
+            return None
+        if profile is not None:
+            # Routes differ between profiles, so the store is not used
+            return self.__profile_path(G, start, end, profile, max_cost,
+                                       max_expansions, weight)
+        if self.trees is not None and G is self.trees.graph:
+            found, route = self.trees.lookup(start, end)
+            if found:
+                if route is not None and max_cost is not None and \
+                        route.cost > max_cost:
+                    return None
+                return route
+        # Weighted searches are not guaranteed to return the shortest route,
+        # so only unweighted searches use the store
+        use_store = self.store is not None and weight == 1.0 and \
+            G is self.store.graph
+        if use_store:
+            route = self.store.get(start, end)
+            if route is not None:
+                if max_cost is not None and route.cost > max_cost:
+                    return None
+                return route
+        if max_cost is None:
+            max_cost = inf
+        elif G.heuristic(start, end) > max_cost:
+            # The end node is further away than max_cost along a straight line
+            return None
+        expansions = 0
+
         # Priority queue to store priority, node, where priority is a sum of
         # (1) the cost so far from the start to the node and
         # (2) an estimated cost from the node to the end
@@ -112,18 +189,454 @@ class PathFinder:
             if current == end:
                 # Found path from start to end
                 path = self.reverse_path(came_from, start, end)
-                return Route(path, cost_so_far[current])
+                route = Route(path, cost_so_far[current])
+                if use_store:
+                    self.store.put(start, end, route)
+                return route
+
+            if max_expansions is not None:
+                expansions += 1
+                if expansions > max_expansions:
+                    # Gave up before finding the end node
+                    return None
 
             for neighbor in G.neighbors(current):
                 new_cost = cost_so_far[current] + \
                     G.cost(current, neighbor)
                 # Ignore nodes that were already visited unless a lower cost
                 # path was found
-                if neighbor not in cost_so_far or new_cost < cost_so_far[neighbor]:
+                if new_cost < cost_so_far.get(neighbor, inf):
+                    estimate = G.heuristic(neighbor, end)
+                    # Ignore nodes that cannot be on a path within max_cost
+                    if new_cost + estimate > max_cost:
+                        continue
                     cost_so_far[neighbor] = new_cost
                     came_from[neighbor] = current
-                    priority = new_cost + G.heuristic(neighbor, end)
+                    priority = new_cost + weight * estimate
                     heappush(open_nodes, [priority, neighbor])
 
         # Found no path from start to end
         return None
+
+    def time_dependent_path(self, G: Graph, start: int, end: int,
+                            departure: float, costs) -> Route:
+        '''
+        Calculate the fastest path when leaving the start node at a given
+        time, using time-dependent travel times.
+
+        This is the A* algorithm where the cost so far of a node is the time
+        it is reached, and the travel time of an edge depends on that time.
+        The heuristic is the Euclidean distance scaled by the lowest possible
+        travel time per cost unit, so it stays admissible. Searches on graphs
+        with fixed costs should use shortest_path, which does not pay for the
+        travel time lookups.
+
+        Parameters
+        ----------
+        G: Graph, the graph structure of warehouse locations
+        start: int, the start node
+        end: int, the end node
+        departure: float, the time in seconds when leaving the start node
+        costs: TimeDependentCosts, the travel times of the edges
+
+        Returns
+        ----------
+        path: Route, object holding the path and the travel time in seconds,
+            or None if there is no path
+        '''
+        if self.__different_components(G, start, end):
+            return None
+        lower_bound = costs.lower_bound_factor()
+        travel_time = costs.travel_time
+        open_nodes = [(0.0, 0.0, start)]
+        came_from = {start: None}
+        time_so_far = {start: 0.0}
+        while open_nodes:
+            _, current_time, current = heappop(open_nodes)
+            if current_time > time_so_far[current]:
+                continue
+            if current == end:
+                path = self.reverse_path(came_from, start, end)
+                return Route(path, current_time)
+            now = departure + current_time
+            for edge in G.nodes[current].edges:
+                neighbor = edge.to_node
+                new_time = current_time + \
+                    travel_time(current, neighbor, edge.cost, now)
+                if new_time < time_so_far.get(neighbor, inf):
+                    time_so_far[neighbor] = new_time
+                    came_from[neighbor] = current
+                    priority = new_time + \
+                        lower_bound * G.heuristic(neighbor, end)
+                    heappush(open_nodes, (priority, new_time, neighbor))
+        return None
+
+    def within_cost(self, G: Graph, start: int, end: int, max_cost: float) -> bool:
+        '''
+        Check if the end node can be reached from the start node at a cost of
+        at most max_cost.
+
+        Pairs that are further apart than max_cost along a straight line are
+        rejected without a search, and the search for the others only expands
+        nodes within max_cost.
+
+        Parameters
+        ----------
+        G: Graph, the graph structure of warehouse locations
+        start: int, the start node
+        end: int, the end node
+        max_cost: float, the maximum cost
+
+        Returns
+        ----------
+        reachable: bool, True if there is a path within max_cost
+        '''
+        return self.shortest_path(G, start, end, max_cost=max_cost) is not None
+
+    def anytime_paths(self, G: Graph, start: int, end: int,
+                      weights: tuple[float, ...] = (3.0, 2.0, 1.5, 1.0),
+                      time_limit: float = None):
+        '''
+        Calculate increasingly better routes using weighted A* searches with
+        decreasing weights.
+
+        The first search uses the largest weight and finds a route quickly.
+        Every following search uses a smaller weight and ignores nodes whose
+        estimated total cost is higher than the cost of the best route found
+        so far, so it only spends time on routes that can improve it. The
+        route found with weight w costs at most w times the cost of the
+        shortest route, which is yielded as the suboptimality bound together
+        with the route. When the last weight is 1, the last route is the
+        shortest route.
+
+        Parameters
+        ----------
+        G: Graph, the graph structure of warehouse locations
+        start: int, the start node
+        end: int, the end node
+        weights: tuple of float, decreasing heuristic weights, at least 1
+        time_limit: float, the maximum time in seconds for all searches, None
+            for no limit
+
+        Yields
+        ----------
+        route: Route, the best route found so far
+        bound: float, the route costs at most bound times the shortest route
+        '''
+        if any(w < 1.0 for w in weights):
+            raise ValueError('Heuristic weight must be at least 1')
+        deadline = None if time_limit is None else perf_counter() + time_limit
+
+        def heuristic(nodeid):
+            return G.heuristic(nodeid, end)
+
+        best = None
+        bound = inf
+        for weight in weights:
+            route = self.__search(G, start, end, heuristic, weight=weight,
+                                  max_cost=inf if best is None else best.cost,
+                                  deadline=deadline)
+            if route is None:
+                # No path, or out of time
+                return
+            if best is None or route.cost < best.cost:
+                best = route
+            bound = min(bound, weight)
+            yield best, bound
+            if bound == 1.0:
+                return
+
+    def shortest_path_tree(self, G: Graph, root: int,
+                           reverse: bool = False) -> tuple[dict[int, float], dict[int, int]]:
+        '''
+        Calculate the shortest path tree from (or to) a root node using
+        Dijkstra's algorithm.
+
+        A forward tree holds the cost from the root to every reachable node
+        and the previous node on the shortest path from the root. A reverse
+        tree holds the cost from every node that can reach the root and the
+        next node on the shortest path towards the root.
+
+        Parameters
+        ----------
+        G: Graph, the graph structure of warehouse locations
+        root: int, the root node of the tree
+        reverse: bool, build the tree of paths into the root instead of out
+            of it
+
+        Returns
+        ----------
+        dist: dict, key: node ID, value: cost between the node and the root
+        pred: dict, key: node ID, value: parent node in the tree (None for
+            the root)
+        '''
+        if reverse:
+            reverse_edges = G.reverse_edges()
+
+            def edges(nodeid):
+                return reverse_edges[nodeid]
+        else:
+            def edges(nodeid):
+                return G.nodes[nodeid].edges
+
+        dist = {root: 0.0}
+        pred = {root: None}
+        open_nodes = [(0.0, root)]
+        while open_nodes:
+            cost, current = heappop(open_nodes)
+            if cost > dist[current]:
+                # Stale queue entry, a cheaper path was already found
+                continue
+            for edge in edges(current):
+                new_cost = cost + edge.cost
+                if new_cost < dist.get(edge.to_node, inf):
+                    dist[edge.to_node] = new_cost
+                    pred[edge.to_node] = current
+                    heappush(open_nodes, (new_cost, edge.to_node))
+        return dist, pred
+
+    def route_cost(self, G: Graph, path: list[int]) -> float:
+        '''
+        Get the cost of traversing the nodes of a path in order.
+
+        Parameters
+        ----------
+        G: Graph, the graph structure of warehouse locations
+        path: list of int, node ID:s of the path
+
+        Returns
+        ----------
+        cost: float, the summed edge costs of the path
+        '''
+        return sum(G.cost(a, b) for a, b in zip(path, path[1:]))
+
+    def k_shortest_paths(self, G: Graph, start: int, end: int, k: int) -> list[Route]:
+        '''
+        Calculate the k shortest loopless paths using Yen's algorithm.
+
+        Every new path deviates from one of the paths already found at a spur
+        node. The spur path from the spur node to the end node is found with
+        an A* search on the graph where the root part of the path and the
+        edges used by earlier paths with the same root are removed. Instead
+        of the Euclidean heuristic, the spur searches use the cost to the end
+        node from a reverse shortest path tree that is built once. It is exact
+        on the full graph and a lower bound on the restricted graph, so the
+        spur searches expand few nodes besides the ones on the spur path.
+
+        Parameters
+        ----------
+        G: Graph, the graph structure of warehouse locations
+        start: int, the start node
+        end: int, the end node
+        k: int, the maximum number of paths
+
+        Returns
+        ----------
+        routes: list of Route, at most k routes sorted by increasing cost
+        '''
+        dist_to_end, next_node = self.shortest_path_tree(G, end, reverse=True)
+        if k < 1 or start not in dist_to_end:
+            return []
+
+        def heuristic(nodeid):
+            return dist_to_end.get(nodeid, inf)
+
+        routes = [Route(self.__tree_path(next_node, start), dist_to_end[start])]
+        candidates = []
+        seen = {tuple(routes[0].path)}
+        while len(routes) < k:
+            previous = routes[-1].path
+            root_cost = 0.0
+            for i in range(len(previous) - 1):
+                spur = previous[i]
+                root = previous[:i + 1]
+                excluded_edges = set()
+                for route in routes:
+                    if route.path[:i + 1] == root:
+                        excluded_edges.add((spur, route.path[i + 1]))
+                spur_route = self.__search(G, spur, end, heuristic,
+                                           excluded_nodes=set(root[:-1]),
+                                           excluded_edges=excluded_edges)
+                if spur_route is not None:
+                    path = root[:-1] + spur_route.path
+                    if tuple(path) not in seen:
+                        seen.add(tuple(path))
+                        heappush(candidates,
+                                 (root_cost + spur_route.cost, path))
+                root_cost += G.cost(spur, previous[i + 1])
+            if not candidates:
+                break
+            cost, path = heappop(candidates)
+            routes.append(Route(path, cost))
+        return routes
+
+    def alternative_routes(self, G: Graph, start: int, end: int, k: int = 3,
+                           max_overlap: float = 0.5, penalty: float = 1.4,
+                           max_iterations: int = None) -> list[Route]:
+        '''
+        Calculate alternative routes with limited overlap using the penalty
+        method.
+
+        This is faster than k_shortest_paths when the best few routes mostly
+        differ by small detours, since every iteration is a single search.
+        After a route is found, the cost of its edges is multiplied by the
+        penalty and a new search is run on the penalized costs. The new route
+        is accepted if the share of its cost that it has in common with every
+        accepted route is at most max_overlap. The searches use the reverse
+        shortest path tree to the end node as heuristic, which stays
+        admissible because penalties only increase the edge costs.
+
+        Parameters
+        ----------
+        G: Graph, the graph structure of warehouse locations
+        start: int, the start node
+        end: int, the end node
+        k: int, the maximum number of routes, including the shortest one
+        max_overlap: float, the largest accepted share of a route's cost that
+            overlaps an already accepted route
+        penalty: float, the factor that costs of used edges are multiplied by
+        max_iterations: int, the maximum number of penalized searches,
+            defaults to 4 * k
+
+        Returns
+        ----------
+        routes: list of Route, the shortest route followed by the accepted
+            alternatives sorted by increasing cost
+        '''
+        dist_to_end, next_node = self.shortest_path_tree(G, end, reverse=True)
+        if k < 1 or start not in dist_to_end:
+            return []
+        if max_iterations is None:
+            max_iterations = 4 * k
+
+        def heuristic(nodeid):
+            return dist_to_end.get(nodeid, inf)
+
+        penalties = {}
+
+        def penalized_cost(node_from, edge):
+            return edge.cost * penalties.get((node_from, edge.to_node), 1.0)
+
+        shortest = Route(self.__tree_path(next_node, start), dist_to_end[start])
+        routes = [shortest]
+        accepted_edges = [self.__edge_costs(G, shortest.path)]
+        candidate = shortest
+        for _ in range(max_iterations):
+            if len(routes) == k:
+                break
+            for edge in zip(candidate.path, candidate.path[1:]):
+                penalties[edge] = penalties.get(edge, 1.0) * penalty
+            candidate = self.__search(G, start, end, heuristic,
+                                      cost=penalized_cost)
+            if candidate is None:
+                break
+            edge_costs = self.__edge_costs(G, candidate.path)
+            cost = sum(edge_costs.values())
+            candidate = Route(candidate.path, cost)
+            if cost > 0 and all(
+                    sum(c for e, c in edge_costs.items() if e in accepted) / cost
+                    <= max_overlap for accepted in accepted_edges):
+                routes.append(candidate)
+                accepted_edges.append(edge_costs)
+        routes[1:] = sorted(routes[1:], key=lambda route: route.cost)
+        return routes
+
+    def __different_components(self, G: Graph, start: int, end: int) -> bool:
+        '''
+        Check if two nodes are in different weakly connected components of a
+        validated graph. Nodes that are not in the components are added
+        after the validation, so they are not known to be disconnected.
+        '''
+        components = G.weak_components
+        return components is not None and start in components and \
+            end in components and components[start] != components[end]
+
+    def __profile_path(self, G: Graph, start: int, end: int, profile,
+                       max_cost: float, max_expansions: int,
+                       weight: float) -> Route:
+        '''
+        A* search restricted to the edges and costs of a routing profile.
+        '''
+        components = profile.components(G)
+        if components.get(start) != components.get(end):
+            return None
+        scale = profile.min_multiplier
+
+        def heuristic(nodeid):
+            return scale * G.heuristic(nodeid, end)
+
+        return self.__search(G, start, end, heuristic, cost=profile.edge_costs(G),
+                             weight=weight,
+                             max_cost=inf if max_cost is None else max_cost,
+                             max_expansions=max_expansions)
+
+    def __tree_path(self, next_node: dict[int, int], start: int) -> list[int]:
+        '''
+        Walk up a reverse shortest path tree from the start node to its root.
+        '''
+        path = [start]
+        while next_node[path[-1]] is not None:
+            path.append(next_node[path[-1]])
+        return path
+
+    def __edge_costs(self, G: Graph, path: list[int]) -> dict[tuple[int, int], float]:
+        '''
+        Get the cost of every edge in a path, keyed by (from, to) node ID:s.
+        '''
+        return {(a, b): G.cost(a, b) for a, b in zip(path, path[1:])}
+
+    def __search(self, G: Graph, start: int, end: int, heuristic,
+                 cost=None, excluded_nodes=frozenset(),
+                 excluded_edges=frozenset(), weight: float = 1.0,
+                 max_cost: float = inf, max_expansions: int = None,
+                 deadline: float = None) -> Route:
+        '''
+        A* search with a custom heuristic and edge cost function, optionally
+        ignoring some nodes and edges. The cost function takes the from-node
+        ID and the Edge, and returns None for edges that may not be used.
+        Nodes with an infinite heuristic value cannot reach the end node and
+        nodes with an estimated total cost above max_cost cannot be on a path
+        within max_cost, so they are never added to the frontier. The search
+        returns None after max_expansions expanded nodes or when the
+        perf_counter deadline has passed.
+        '''
+        if start in excluded_nodes:
+            return None
+        open_nodes = [(heuristic(start), 0.0, start)]
+        came_from = {start: None}
+        cost_so_far = {start: 0.0}
+        expansions = 0
+        while open_nodes:
+            _, current_cost, current = heappop(open_nodes)
+            if current_cost > cost_so_far[current]:
+                continue
+            if current == end:
+                path = self.reverse_path(came_from, start, end)
+                return Route(path, current_cost)
+            if deadline is not None and perf_counter() > deadline:
+                return None
+            if max_expansions is not None:
+                expansions += 1
+                if expansions > max_expansions:
+                    return None
+            for edge in G.nodes[current].edges:
+                neighbor = edge.to_node
+                if neighbor in excluded_nodes or \
+                        (current, neighbor) in excluded_edges:
+                    continue
+                if cost is None:
+                    edge_cost = edge.cost
+                else:
+                    edge_cost = cost(current, edge)
+                    if edge_cost is None:
+                        continue
+                new_cost = current_cost + edge_cost
+                if new_cost < cost_so_far.get(neighbor, inf):
+                    estimate = heuristic(neighbor)
+                    if estimate == inf or new_cost + estimate > max_cost:
+                        continue
+                    cost_so_far[neighbor] = new_cost
+                    came_from[neighbor] = current
+                    heappush(open_nodes,
+                             (new_cost + weight * estimate, new_cost, neighbor))
+        return None
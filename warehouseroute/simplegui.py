@@ -20,6 +20,11 @@ class WarehouseRouteGUI():
     algorithm is used to find the shortest route. The route is highlighted in
     the warehouse map and the cost/distance is displayed above the map.
 
+    For warehouses with several floors, a drop-down menu selects the floor
+    that is shown. Only the locations, connections and route parts on that
+    floor are drawn, and nodes with lifts or stairs to other floors are
+    marked with squares.
+
     The warehouse graph JSON file is provided as a command line argument. 
     '''
 
@@ -69,6 +74,16 @@ class WarehouseRouteGUI():
         self.distvar = StringVar()
         distvalue = ttk.Label(mainframe, textvariable=self.distvar)
 
+        # Floor drop-down list, only shown for graphs with several floors
+        floors = self.G.floors()
+        self.floor = floors[0] if floors else 0
+        self.floor_combobox = ttk.Combobox(mainframe, state='readonly')
+        self.floor_combobox.bind("<<ComboboxSelected>>", self.change_floor)
+        self.floor_combobox['values'] = ['Floor ' + str(f) for f in floors]
+        if floors:
+            self.floor_combobox.current(0)
+        self.floors = floors
+
         # Figure for drawing the graph and shortest route
         fig = Figure(figsize=(5, 5), dpi=100)
         self.ax = fig.add_subplot(111)
@@ -84,6 +99,8 @@ class WarehouseRouteGUI():
         button.grid(column=2, row=0)
         distlabel.grid(column=0, row=1)
         distvalue.grid(column=1, row=1)
+        if len(floors) > 1:
+            self.floor_combobox.grid(column=2, row=1)
         self.canvas.get_tk_widget().grid(column=0, row=2, columnspan=3)
 
         # Setup for resizing window
@@ -91,18 +108,32 @@ class WarehouseRouteGUI():
         root.rowconfigure(0, weight=1)
 
     def draw_location(self, loc_str, colorcode):
+        ''' Mark a location, if it is on the shown floor '''
         loc = self.locationdict[loc_str]
         node = self.G.get_node_for_location(loc)
+        if node.position.floor != self.floor:
+            return None
         x = node.position.x
         y = node.position.y
         line, = self.ax.plot(x, y, 'D', c=colorcode)
         self.canvas.draw()
         return line
 
+    def change_floor(self, event):
+        ''' Redraw the map for the selected floor '''
+        self.floor = self.floors[self.floor_combobox.current()]
+        self.ax.clear()
+        self.draw_graph()
+        self.startloc_plot = self.draw_location(self.start_combobox.get(), 'g')
+        self.endloc_plot = self.draw_location(self.end_combobox.get(), 'r')
+        self.path_plot_list = []
+        if getattr(self, 'route', None) is not None:
+            self.draw_path(self.route.path)
+
     def draw_startloc(self, event):
         ''' Mark the selected start location in the graph '''
         # Remove previously marked start location
-        if hasattr(self, 'startloc_plot'):
+        if getattr(self, 'startloc_plot', None) is not None:
             self.startloc_plot.remove()
         self.remove_path_plot()
         start_str = self.start_combobox.get()
@@ -111,41 +142,54 @@ class WarehouseRouteGUI():
     def draw_endloc(self, event):
         ''' Mark the selected end location in the graph '''
         # Remove previously marked end location
-        if hasattr(self, 'endloc_plot'):
+        if getattr(self, 'endloc_plot', None) is not None:
             self.endloc_plot.remove()
         self.remove_path_plot()
         start_str = self.end_combobox.get()
         self.endloc_plot = self.draw_location(start_str, 'r')
 
     def draw_graph(self):
-        ''' Draw all locations and connections '''
+        ''' Draw all locations and connections on the shown floor '''
+        floor_nodes = [n for n in self.nodedict.values()
+                       if n.position.floor == self.floor]
+        connector_nodes = []
         # Plot edges
-        for _, node in self.nodedict.items():
+        for node in floor_nodes:
             x0 = node.position.x
             y0 = node.position.y
             # Loop node edges
             for edge in node.edges:
                 # Get to-node
                 tonode = self.nodedict[edge.to_node]
+                if tonode.position.floor != self.floor:
+                    # Connector to another floor
+                    connector_nodes.append(node)
+                    continue
                 x1 = tonode.position.x
                 y1 = tonode.position.y
                 self.ax.plot([x0, x1], [y0, y1], 'k-')
         # Plot nodes
-        node_positions = [n.position for n in self.nodedict.values()]
+        node_positions = [n.position for n in floor_nodes]
         x = [n.x for n in node_positions]
         y = [n.y for n in node_positions]
         self.ax.plot(x, y, 'o', c='lightgray')
+        if connector_nodes:
+            x = [n.position.x for n in connector_nodes]
+            y = [n.position.y for n in connector_nodes]
+            self.ax.plot(x, y, 's', c='orange')
         # Update canvas
         self.canvas.draw()
 
     def get_route(self):
         ''' Calculate distance and draw path '''
         self.remove_path_plot()
-        route = self.get_shortest_path()
-        self.draw_path(route.path)
+        self.route = self.get_shortest_path()
+        self.draw_path(self.route.path)
 
     def remove_path_plot(self):
         ''' Remove previous shortest path from figure '''
+        # The route is not redrawn on another floor once it is removed
+        self.route = None
         if hasattr(self, 'path_plot_list'):
             for plotobj in self.path_plot_list:
                 plotobj.remove()
@@ -170,19 +214,19 @@ class WarehouseRouteGUI():
         return route
 
     def draw_path(self, path):
-        ''' Draw the path on the map '''
+        ''' Draw the part of the path on the shown floor on the map '''
         # Get list of positions for the path nodes
-        path_node_dict = {k: self.nodedict[k] for k in path}
-        node_positions = [n.position for n in path_node_dict.values()]
-        x = [n.x for n in node_positions]
-        y = [n.y for n in node_positions]
+        node_positions = [self.nodedict[k].position for k in path]
         self.path_plot_list = []
-        # Draw nodes except start and end node
-        nodes_plot, = self.ax.plot(x[1:-1], y[1:-1], 'bo')
+        # Draw nodes on the floor except start and end node
+        inner = [p for p in node_positions[1:-1] if p.floor == self.floor]
+        nodes_plot, = self.ax.plot([p.x for p in inner], [p.y for p in inner], 'bo')
         self.path_plot_list.append(nodes_plot)
-        # Draw edges
-        for i in range(len(x)-1):
-            edge_plot, = self.ax.plot([x[i], x[i+1]], [y[i], y[i+1]], 'b-')
+        # Draw edges on the floor
+        for a, b in zip(node_positions, node_positions[1:]):
+            if a.floor != self.floor or b.floor != self.floor:
+                continue
+            edge_plot, = self.ax.plot([a.x, b.x], [a.y, b.y], 'b-')
             self.path_plot_list.append(edge_plot)
         # Update canvas
         self.canvas.draw()
@@ -0,0 +1,158 @@
+from bisect import bisect_right
+from graph import Graph
+
+
+class CostProfile:
+    '''
+    Piecewise-linear cost factor over the time of day.
+
+    The factor is given at a number of breakpoints and interpolated linearly
+    between them. The profile repeats every period, so the factor between the
+    last breakpoint and the end of the period is interpolated towards the
+    first breakpoint of the next period.
+
+    Travel times must not let a vehicle arrive earlier by leaving later (the
+    FIFO property), i.e. the factor must not drop faster than the time it
+    takes to traverse the edge. Profiles for congestion by time of day
+    normally have this property.
+
+    Attributes
+    ----------
+    times: list of float, the breakpoints in seconds from the start of the
+        period, in increasing order
+    factors: list of float, the cost factor at each breakpoint
+    period: float, the length of the period in seconds
+    '''
+
+    def __init__(self, times: list[float], factors: list[float],
+                 period: float = 86400.0):
+        if len(times) == 0 or len(times) != len(factors):
+            raise ValueError('Cost profile needs one factor per breakpoint')
+        if any(t1 <= t0 for t0, t1 in zip(times, times[1:])) or \
+                times[0] < 0 or times[-1] >= period:
+            raise ValueError('Cost profile breakpoints must be increasing and within the period')
+        if min(factors) <= 0:
+            raise ValueError('Cost profile factors must be positive')
+        self.times = list(times)
+        self.factors = list(factors)
+        self.period = period
+        self.min_factor = min(factors)
+
+    def factor(self, t: float) -> float:
+        '''
+        Get the cost factor at a time.
+
+        Parameters
+        ----------
+        t: float, the time in seconds
+
+        Returns
+        ----------
+        factor: float, the interpolated cost factor
+        '''
+        t = t % self.period
+        i = bisect_right(self.times, t)
+        if i == 0:
+            t0 = self.times[-1] - self.period
+            f0 = self.factors[-1]
+        else:
+            t0 = self.times[i - 1]
+            f0 = self.factors[i - 1]
+        if i == len(self.times):
+            t1 = self.times[0] + self.period
+            f1 = self.factors[0]
+        else:
+            t1 = self.times[i]
+            f1 = self.factors[i]
+        if t1 == t0:
+            return f0
+        return f0 + (f1 - f0) * (t - t0) / (t1 - t0)
+
+
+class TimeDependentCosts:
+    '''
+    Time-dependent travel times for the edges of a graph.
+
+    The travel time of an edge is its cost in the graph divided by the speed,
+    multiplied by the factor of the edge's cost profile at the time the edge
+    is entered and by the edge's current congestion factor. Edges without a
+    profile use the default profile, or a factor of 1 if there is none.
+    Congestion factors are meant to be updated from live counters.
+
+    The smallest factor that any edge can have is kept as a lower bound,
+    which scales the Euclidean heuristic so that it stays admissible for
+    the time-dependent search.
+
+    Attributes
+    ----------
+    speed: float, graph cost units per second at a factor of 1
+    default_profile: CostProfile, used for edges without a profile, or None
+    '''
+
+    def __init__(self, speed: float = 1.0, default_profile: CostProfile = None):
+        self.speed = speed
+        self.default_profile = default_profile
+        self._profiles = {}
+        self._congestion = {}
+        self._lower_bound = None
+
+    def set_profile(self, node_from: int, node_to: int, profile: CostProfile):
+        ''' Set the cost profile of the edge from node_from to node_to '''
+        self._profiles[(node_from, node_to)] = profile
+        self._lower_bound = None
+
+    def set_congestion(self, node_from: int, node_to: int, factor: float):
+        '''
+        Set the current congestion factor of the edge from node_from to
+        node_to, 1 for no congestion.
+        '''
+        if factor <= 0:
+            raise ValueError('Congestion factor must be positive')
+        if factor == 1.0:
+            self._congestion.pop((node_from, node_to), None)
+        else:
+            self._congestion[(node_from, node_to)] = factor
+        self._lower_bound = None
+
+    def travel_time(self, node_from: int, node_to: int, cost: float,
+                    t: float) -> float:
+        '''
+        Get the time to traverse an edge.
+
+        Parameters
+        ----------
+        node_from: int, node ID
+        node_to: int, node ID
+        cost: float, the cost of the edge in the graph
+        t: float, the time in seconds when the edge is entered
+
+        Returns
+        ----------
+        time: float, the travel time in seconds
+        '''
+        edge = (node_from, node_to)
+        profile = self._profiles.get(edge, self.default_profile)
+        time = cost / self.speed
+        if profile is not None:
+            time *= profile.factor(t)
+        return time * self._congestion.get(edge, 1.0)
+
+    def lower_bound_factor(self) -> float:
+        '''
+        Get a lower bound of the travel time per graph cost unit over all
+        edges and times.
+        '''
+        if self._lower_bound is None:
+            factors = [p.min_factor for p in self._profiles.values()]
+            factors.append(1.0 if self.default_profile is None
+                           else self.default_profile.min_factor)
+            congestion = min(self._congestion.values(), default=1.0)
+            self._lower_bound = min(factors) * min(congestion, 1.0) / self.speed
+        return self._lower_bound
+
+    def heuristic(self, G: Graph, node1: int, node2: int) -> float:
+        '''
+        Admissible estimate of the travel time from node 1 to node 2, assuming
+        that the graph heuristic is admissible for the edge costs.
+        '''
+        return G.heuristic(node1, node2) * self.lower_bound_factor()
@@ -0,0 +1,251 @@
+from heapq import heappush, heappop
+from math import inf
+import numpy as np
+from graph import Graph, Position
+from pathtree import ShortestPathTree, TreeCache
+from shortestpath import PathFinder, Route
+
+
+class RouteTracker:
+    '''
+    Tracks a vehicle that drives a route to a goal node.
+
+    The tracker takes the positions reported by the vehicle, snaps them to
+    the graph and tells whether the vehicle is still on its route. Instead of
+    searching again when the vehicle deviates, it keeps a reverse shortest
+    path tree into the goal node, which holds the cost to the goal and the
+    next node towards it from every node. The new route from the node that
+    the vehicle deviated to is found by walking up the tree, which takes time
+    proportional to the length of the route.
+
+    When the cost of an edge changes, the tree is repaired instead of built
+    again. If the cost decreases, the lower costs are propagated to the nodes
+    that now reach the goal cheaper through the edge. If the edge is in the
+    tree, the subtree of nodes whose route uses it is invalidated and rebuilt
+    from its boundary with the rest of the tree. Both repairs only visit the
+    nodes whose cost to the goal changes and their neighbours. The route is
+    replaced by the route from the tree when the tree gives a cheaper route
+    than the rest of the current route.
+
+    Attributes
+    ----------
+    G: Graph, the graph structure of warehouse locations
+    goal: int, the goal node of the route
+    route: Route, the route the vehicle is expected to drive, None if the
+        goal cannot be reached from the position of the vehicle
+    progress: int, the index in the route path of the last node passed
+    tolerance: float, the largest distance from the route at which the
+        vehicle is still on the route
+    tree: ShortestPathTree, the reverse shortest path tree into the goal
+    replans: int, the number of times the route has been replaced
+    '''
+
+    def __init__(self, G: Graph, route: Route, tolerance: float = 1.0,
+                 trees: TreeCache = None):
+        self.G = G
+        self.goal = route.path[-1]
+        self.route = route
+        self.progress = 0
+        self.tolerance = tolerance
+        self.replans = 0
+        self._last_node = route.path[0]
+
+        tree = trees.get(self.goal, reverse=True) if trees is not None else None
+        if tree is None:
+            dist, pred = PathFinder().shortest_path_tree(G, self.goal, reverse=True)
+        else:
+            # The tree is repaired in place, so cached trees are copied
+            dist, pred = dict(tree.dist), dict(tree.pred)
+        self.tree = ShortestPathTree(self.goal, dist, pred, reverse=True)
+        self._children = {}
+        for nodeid, parent in pred.items():
+            if parent is not None:
+                self._children.setdefault(parent, set()).add(nodeid)
+        self._predecessors = {nodeid: [] for nodeid in G.nodes}
+        for nodeid, node in G.nodes.items():
+            for edge in node.edges:
+                self._predecessors.setdefault(edge.to_node, []).append(nodeid)
+
+        # Node coordinates by floor for snapping
+        self._floors = {}
+        for floor in G.floors():
+            nodes = [n for n in G.nodes.values() if n.position.floor == floor]
+            self._floors[floor] = (
+                np.array([n.id for n in nodes]),
+                np.array([[n.position.x, n.position.y] for n in nodes]))
+
+    def snap(self, position: Position) -> int:
+        '''
+        Get the node closest to a position on the same floor.
+
+        Parameters
+        ----------
+        position: Position, the position of the vehicle
+
+        Returns
+        ----------
+        nodeid: int, the closest node, None if there are no nodes on the floor
+        '''
+        if position.floor not in self._floors:
+            return None
+        node_ids, xy = self._floors[position.floor]
+        squared = ((xy - [position.x, position.y]) ** 2).sum(axis=1)
+        return int(node_ids[squared.argmin()])
+
+    def update(self, position: Position) -> bool:
+        '''
+        Update the position of the vehicle. If the vehicle is off its route,
+        the route is replaced by the shortest route from the node closest to
+        the position.
+
+        Parameters
+        ----------
+        position: Position, the position of the vehicle
+
+        Returns
+        ----------
+        on_route: bool, True if the vehicle was on its route
+        '''
+        if self.route is not None:
+            segment = self.__find_segment(position)
+            if segment is not None:
+                self.progress = segment
+                return True
+        self.__replan(self.snap(position))
+        return False
+
+    def remaining(self) -> Route:
+        ''' Get the rest of the route from the last node passed '''
+        if self.route is None:
+            return None
+        path = self.route.path[self.progress:]
+        return Route(path, PathFinder().route_cost(self.G, path))
+
+    def set_edge_cost(self, node_from: int, node_to: int, cost: float):
+        '''
+        Change the cost of an edge in the graph and repair the tree. The
+        route is replaced if the tree gives a cheaper route from the last node
+        passed than the rest of the current route.
+
+        The graph is shared, so other trackers of the same graph must be
+        told about the change with edge_cost_changed.
+
+        Parameters
+        ----------
+        node_from: int, node ID
+        node_to: int, node ID
+        cost: float, the new cost of the edge
+        '''
+        self.G.set_edge_cost(node_from, node_to, cost)
+        self.edge_cost_changed(node_from, node_to)
+
+    def edge_cost_changed(self, node_from: int, node_to: int):
+        '''
+        Repair the tree after the cost of an edge in the graph has changed,
+        and replace the route if the tree gives a cheaper route from the last
+        node passed than the rest of the current route.
+
+        Parameters
+        ----------
+        node_from: int, node ID
+        node_to: int, node ID
+        '''
+        dist, pred = self.tree.dist, self.tree.pred
+        open_nodes = []
+        if pred.get(node_from) == node_to:
+            # The routes of the subtree of node_from use the edge, so their
+            # costs are computed again from the rest of the tree
+            subtree = self.__detach(node_from)
+            for nodeid in subtree:
+                best, parent = inf, None
+                for edge in self.G.nodes[nodeid].edges:
+                    if edge.to_node in dist and edge.cost + dist[edge.to_node] < best:
+                        best, parent = edge.cost + dist[edge.to_node], edge.to_node
+                if parent is not None:
+                    self.__set_parent(nodeid, parent, best)
+                    heappush(open_nodes, (best, nodeid))
+        else:
+            new_cost = self.G.cost(node_from, node_to) + dist.get(node_to, inf)
+            if new_cost < dist.get(node_from, inf):
+                self.__set_parent(node_from, node_to, new_cost)
+                heappush(open_nodes, (new_cost, node_from))
+
+        # Propagate the new costs to the nodes whose routes go through them
+        while open_nodes:
+            cost, current = heappop(open_nodes)
+            if cost > dist[current]:
+                # Stale queue entry, a cheaper path was already found
+                continue
+            for nodeid in self._predecessors.get(current, []):
+                new_cost = cost + self.G.cost(nodeid, current)
+                if new_cost < dist.get(nodeid, inf):
+                    self.__set_parent(nodeid, current, new_cost)
+                    heappush(open_nodes, (new_cost, nodeid))
+
+        if self.route is not None:
+            current = self.route.path[self.progress]
+            # The route is dropped if the goal can no longer be reached
+            if current not in dist or dist[current] < self.remaining().cost - 1e-9:
+                self.__replan(current)
+        elif self._last_node in dist:
+            # The goal can be reached again from where the vehicle left off
+            self.__replan(self._last_node)
+
+    def __find_segment(self, position: Position) -> int:
+        '''
+        Find the first segment of the rest of the route within the tolerance
+        of a position, returns the index of its first node or None
+        '''
+        path = self.route.path
+        nodes = self.G.nodes
+        if len(path) == 1:
+            a = nodes[path[0]].position
+            close = a.floor == position.floor and \
+                (a.x - position.x) ** 2 + (a.y - position.y) ** 2 <= self.tolerance ** 2
+            return 0 if close else None
+        for i in range(self.progress, len(path) - 1):
+            a = nodes[path[i]].position
+            b = nodes[path[i + 1]].position
+            if position.floor not in (a.floor, b.floor):
+                continue
+            if self.__segment_distance(position, a, b) <= self.tolerance:
+                return i
+        return None
+
+    @staticmethod
+    def __segment_distance(p: Position, a: Position, b: Position) -> float:
+        ''' Distance from a point to a line segment in the plane '''
+        dx, dy = b.x - a.x, b.y - a.y
+        length = dx * dx + dy * dy
+        t = 0.0 if length == 0 else \
+            min(max(((p.x - a.x) * dx + (p.y - a.y) * dy) / length, 0.0), 1.0)
+        return ((a.x + t * dx - p.x) ** 2 + (a.y + t * dy - p.y) ** 2) ** 0.5
+
+    def __replan(self, nodeid: int):
+        ''' Replace the route by the route from a node in the tree '''
+        self._last_node = nodeid
+        self.route = self.tree.route(nodeid) if nodeid is not None else None
+        self.progress = 0
+        self.replans += 1
+
+    def __detach(self, root: int) -> list[int]:
+        ''' Remove a subtree from the tree and return its nodes '''
+        subtree = [root]
+        i = 0
+        while i < len(subtree):
+            subtree.extend(self._children.pop(subtree[i], ()))
+            i += 1
+        self._children.get(self.tree.pred[root], set()).discard(root)
+        for nodeid in subtree:
+            del self.tree.dist[nodeid]
+            del self.tree.pred[nodeid]
+        return subtree
+
+    def __set_parent(self, nodeid: int, parent: int, cost: float):
+        ''' Move a node to a new parent in the tree '''
+        old = self.tree.pred.get(nodeid)
+        if old is not None:
+            self._children[old].discard(nodeid)
+        self._children.setdefault(parent, set()).add(nodeid)
+        self.tree.pred[nodeid] = parent
+        self.tree.dist[nodeid] = cost
@@ -0,0 +1,226 @@
+from graph import Graph
+
+
+class ValidationReport:
+    '''
+    Result of validating a graph.
+
+    Attributes
+    ----------
+    dangling_edges: list of tuples, (from, to) node ID:s of edges to node
+        ID:s that are not in the graph
+    duplicate_locations: list of lists, node ID:s of nodes that share a
+        location, one list per location
+    asymmetric_edges: list of tuples, (from, to) node ID:s of edges without
+        a reverse edge, or whose reverse edge has a different cost
+    strong_components: dict, key: node ID, value: strongly connected
+        component ID, where component 0 is the largest component
+    weak_components: dict, key: node ID, value: weakly connected component
+        ID, where component 0 is the largest component
+    unreachable_nodes: list of int, node ID:s of the nodes outside of the
+        largest strongly connected component, i.e. nodes that cannot be
+        reached from or cannot reach most of the graph
+    '''
+
+    def __init__(self):
+        self.dangling_edges = []
+        self.duplicate_locations = []
+        self.asymmetric_edges = []
+        self.strong_components = {}
+        self.weak_components = {}
+        self.unreachable_nodes = []
+
+    def __str__(self):
+        return 'dangling edges ' + str(len(self.dangling_edges)) + \
+            ' duplicate locations ' + str(len(self.duplicate_locations)) + \
+            ' asymmetric edges ' + str(len(self.asymmetric_edges)) + \
+            ' unreachable nodes ' + str(len(self.unreachable_nodes))
+
+    def is_valid(self) -> bool:
+        '''
+        Check that the graph has no dangling edges and no duplicate locations,
+        which would make queries fail. Asymmetric edges and unreachable nodes
+        may be intended, e.g. for one-way aisles, and are only reported.
+        '''
+        return not self.dangling_edges and not self.duplicate_locations
+
+
+class GraphValidator:
+    '''
+    Validation and connectivity analysis of graphs.
+
+    The validator finds edges to missing nodes, locations that belong to more
+    than one node, edges that have no reverse edge with the same cost, and
+    the strongly and weakly connected components of the graph. All checks
+    run in time linear in the number of nodes and edges.
+
+    The component ID:s are also stored in the strong_components and
+    weak_components attributes of the graph. Nodes in different weakly
+    connected components cannot reach each other, which lets PathFinder
+    reject such queries without searching.
+    '''
+
+    def __init__(self, asymmetry_tolerance: float = 1e-9):
+        '''
+        Constructor
+
+        Parameters
+        ----------
+        asymmetry_tolerance: float, the largest difference between the costs
+            of an edge and its reverse edge that is not reported
+        '''
+        self.asymmetry_tolerance = asymmetry_tolerance
+
+    def validate(self, G: Graph) -> ValidationReport:
+        '''
+        Validate the graph and find its connected components.
+
+        Parameters
+        ----------
+        G: Graph, the graph to validate
+
+        Returns
+        ----------
+        report: ValidationReport, the problems and components found
+        '''
+        report = ValidationReport()
+        self.__check_edges(G, report)
+        self.__check_locations(G, report)
+        report.strong_components = self.__strong_components(G)
+        report.weak_components = self.__weak_components(G)
+        report.unreachable_nodes = [
+            nodeid for nodeid, component in report.strong_components.items()
+            if component != 0]
+        G.strong_components = report.strong_components
+        G.weak_components = report.weak_components
+        return report
+
+    def __check_edges(self, G: Graph, report: ValidationReport):
+        ''' Find dangling and asymmetric edges '''
+        edge_costs = {nodeid: {e.to_node: e.cost for e in node.edges}
+                      for nodeid, node in G.nodes.items()}
+        for nodeid, costs in edge_costs.items():
+            for to_node, cost in costs.items():
+                if to_node not in edge_costs:
+                    report.dangling_edges.append((nodeid, to_node))
+                    continue
+                reverse_cost = edge_costs[to_node].get(nodeid)
+                if reverse_cost is None or \
+                        abs(reverse_cost - cost) > self.asymmetry_tolerance:
+                    report.asymmetric_edges.append((nodeid, to_node))
+
+    def __check_locations(self, G: Graph, report: ValidationReport):
+        ''' Find locations that belong to more than one node '''
+        # Locations are not hashable, but their type and string representation
+        # identify them
+        nodes_by_location = {}
+        for nodeid, node in G.nodes.items():
+            key = (type(node.location).__name__, str(node.location))
+            nodes_by_location.setdefault(key, []).append(nodeid)
+        report.duplicate_locations = [
+            nodeids for nodeids in nodes_by_location.values()
+            if len(nodeids) > 1]
+
+    def __strong_components(self, G: Graph) -> dict[int, int]:
+        '''
+        Find the strongly connected components with an iterative version of
+        Tarjan's algorithm, which does not hit the recursion limit on large
+        graphs.
+        '''
+        index = {}
+        lowlink = {}
+        on_stack = set()
+        stack = []
+        components = []
+        for root in G.nodes:
+            if root in index:
+                continue
+            # Depth first search where each entry holds a node and an
+            # iterator over its remaining neighbours
+            work = [(root, iter(G.neighbors(root)))]
+            index[root] = lowlink[root] = len(index)
+            stack.append(root)
+            on_stack.add(root)
+            while work:
+                nodeid, neighbors = work[-1]
+                advanced = False
+                for neighbor in neighbors:
+                    if neighbor not in G.nodes:
+                        # Dangling edge
+                        continue
+                    if neighbor not in index:
+                        index[neighbor] = lowlink[neighbor] = len(index)
+                        stack.append(neighbor)
+                        on_stack.add(neighbor)
+                        work.append((neighbor, iter(G.neighbors(neighbor))))
+                        advanced = True
+                        break
+                    elif neighbor in on_stack:
+                        lowlink[nodeid] = min(lowlink[nodeid], index[neighbor])
+                if advanced:
+                    continue
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    lowlink[parent] = min(lowlink[parent], lowlink[nodeid])
+                if lowlink[nodeid] == index[nodeid]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        component.append(member)
+                        if member == nodeid:
+                            break
+                    components.append(component)
+        return _component_ids(components)
+
+    def __weak_components(self, G: Graph) -> dict[int, int]:
+        ''' Find the weakly connected components of all edges '''
+        return weak_components(G)
+
+
+def weak_components(G: Graph, edge_filter=None) -> dict[int, int]:
+    '''
+    Find the weakly connected components of a graph with breadth first
+    search. The components are numbered by decreasing size.
+
+    Parameters
+    ----------
+    G: Graph, the graph structure of warehouse locations
+    edge_filter: function taking an Edge and returning True if the edge is
+        used, None to use all edges
+
+    Returns
+    ----------
+    components: dict, key: node ID, value: component ID
+    '''
+    undirected = {nodeid: [] for nodeid in G.nodes}
+    for nodeid, node in G.nodes.items():
+        for edge in node.edges:
+            if edge.to_node in undirected and \
+                    (edge_filter is None or edge_filter(edge)):
+                undirected[nodeid].append(edge.to_node)
+                undirected[edge.to_node].append(nodeid)
+    visited = set()
+    components = []
+    for root in G.nodes:
+        if root in visited:
+            continue
+        visited.add(root)
+        component = [root]
+        i = 0
+        while i < len(component):
+            for neighbor in undirected[component[i]]:
+                if neighbor not in visited:
+                    visited.add(neighbor)
+                    component.append(neighbor)
+            i += 1
+        components.append(component)
+    return _component_ids(components)
+
+
+def _component_ids(components: list[list[int]]) -> dict[int, int]:
+    ''' Number the components by decreasing size '''
+    components.sort(key=len, reverse=True)
+    return {nodeid: i for i, component in enumerate(components)
+            for nodeid in component}
@@ -0,0 +1,169 @@
+from heapq import heappush, heappop
+from math import inf, sqrt
+import numpy as np
+from graph import Graph
+from grapharrays import GraphArrays
+from shortestpath import Route
+
+
+class VectorizedPathFinder:
+    '''
+    A* search on a graph stored in NumPy arrays.
+
+    PathFinder.shortest_path looks up the positions of two nodes and calls
+    sqrt for every node it adds to the frontier. This search keeps the node
+    coordinates in contiguous arrays instead and, when a node is expanded,
+    computes the costs and heuristic values of all its neighbours in one
+    vectorized step. NumPy has an overhead per call, so the vectorized step
+    is only used for nodes with at least vector_degree edges, and nodes with
+    few edges read the coordinates from plain lists instead of Position
+    objects. For dense grid-like layouts, where a search expands a large
+    share of the nodes, the heuristic to the end node is instead computed
+    for all nodes up front in a single vectorized operation.
+
+    The heuristic is the same as Graph.heuristic, including the extra cost
+    of changing floors, so the routes have the same cost as PathFinder. The
+    arrays are made again when the graph has been changed through its
+    methods.
+
+    Attributes
+    ----------
+    G: Graph, the graph structure of warehouse locations
+    arrays: GraphArrays, the graph as arrays
+    precompute: bool, compute the heuristic for all nodes up front, by
+        default for graphs with an average of at least min_degree edges per
+        node, which is typical for grid-like layouts
+    vector_degree: int, the smallest number of edges of a node for which
+        the neighbours are handled in one vectorized step
+    '''
+
+    def __init__(self, G: Graph, arrays: GraphArrays = None,
+                 precompute: bool = None, min_degree: float = 3.0,
+                 vector_degree: int = 16):
+        self.G = G
+        self.__load(arrays if arrays is not None else GraphArrays.from_graph(G))
+        if precompute is None:
+            precompute = len(self.arrays.indices) >= min_degree * len(self.arrays)
+        self.precompute = precompute
+        self.vector_degree = vector_degree
+
+    def __load(self, arrays: GraphArrays):
+        ''' Use arrays of the current revision of the graph '''
+        self.arrays = arrays
+        self._revision = self.G.revision
+        # Single elements of lists are faster to read than of arrays, so the
+        # per-node work reads from list copies of the arrays
+        self._indptr = self.arrays.indptr.tolist()
+        self._indices = self.arrays.indices.tolist()
+        self._costs = self.arrays.costs.tolist()
+        self._x = self.arrays.x.tolist()
+        self._y = self.arrays.y.tolist()
+        self._floor = self.arrays.floor.tolist()
+        self._node_ids = self.arrays.node_ids.tolist()
+        self._connector_bound = self.G.connector_bound() \
+            if len(np.unique(self.arrays.floor)) > 1 else 0.0
+
+    def heuristic(self, nodes: np.ndarray, end: int) -> np.ndarray:
+        '''
+        Estimate the cost from many nodes to the end node at once.
+
+        Parameters
+        ----------
+        nodes: int array, node indices
+        end: int, node index of the end node
+
+        Returns
+        ----------
+        dist: float array, the estimated cost from every node
+        '''
+        a = self.arrays
+        dx = a.x[nodes] - a.x[end]
+        dy = a.y[nodes] - a.y[end]
+        dist = np.sqrt(dx * dx + dy * dy)
+        if self._connector_bound:
+            dist += self._connector_bound * (a.floor[nodes] != a.floor[end])
+        return dist
+
+    def shortest_path(self, start: int, end: int) -> Route:
+        '''
+        Calculate the shortest path using the A* algorithm.
+
+        Parameters
+        ----------
+        start: int, the start node ID
+        end: int, the end node ID
+
+        Returns
+        ----------
+        path: Route, object holding the path and the cost of the path, or
+            None if there is no path
+        '''
+        if self.G.revision != self._revision:
+            # The graph has changed since the arrays were made
+            self.__load(GraphArrays.from_graph(self.G))
+        a = self.arrays
+        source = a.index[start]
+        target = a.index[end]
+        indptr, indices, costs = self._indptr, self._indices, self._costs
+        vector_degree = self.vector_degree
+        if self.precompute:
+            estimates = self.heuristic(slice(None), target).tolist()
+        else:
+            x, y = self._x, self._y
+            xt, yt = x[target], y[target]
+            floor, ft = self._floor, self._floor[target]
+            bound = self._connector_bound
+        cost_so_far = [inf] * len(a)
+        cost_so_far[source] = 0.0
+        came_from = [-1] * len(a)
+
+        open_nodes = [(0.0, 0.0, source)]
+        while open_nodes:
+            _, current_cost, current = heappop(open_nodes)
+            if current_cost > cost_so_far[current]:
+                # Stale queue entry, a cheaper path was already found
+                continue
+            if current == target:
+                return Route(self.__path(came_from, source, target), current_cost)
+
+            first, last = indptr[current], indptr[current + 1]
+            if not self.precompute and last - first >= vector_degree:
+                # Costs and heuristic of all neighbours in one step, keeping
+                # the improved ones
+                neighbors = a.indices[first:last]
+                new_costs = current_cost + a.costs[first:last]
+                improved = new_costs < np.array([cost_so_far[n] for n in neighbors.tolist()])
+                neighbors = neighbors[improved]
+                new_costs = new_costs[improved]
+                priorities = new_costs + self.heuristic(neighbors, target)
+                for priority, new_cost, neighbor in zip(
+                        priorities.tolist(), new_costs.tolist(), neighbors.tolist()):
+                    cost_so_far[neighbor] = new_cost
+                    came_from[neighbor] = current
+                    heappush(open_nodes, (priority, new_cost, neighbor))
+                continue
+
+            for k in range(first, last):
+                neighbor = indices[k]
+                new_cost = current_cost + costs[k]
+                if new_cost < cost_so_far[neighbor]:
+                    cost_so_far[neighbor] = new_cost
+                    came_from[neighbor] = current
+                    if self.precompute:
+                        estimate = estimates[neighbor]
+                    else:
+                        dx = x[neighbor] - xt
+                        dy = y[neighbor] - yt
+                        estimate = sqrt(dx * dx + dy * dy)
+                        if bound and floor[neighbor] != ft:
+                            estimate += bound
+                    heappush(open_nodes, (new_cost + estimate, new_cost, neighbor))
+        return None
+
+    def __path(self, came_from: list[int], source: int, target: int) -> list[int]:
+        ''' Follow the parent indices back from the target to the source '''
+        path = [target]
+        while path[-1] != source:
+            path.append(came_from[path[-1]])
+        path.reverse()
+        return [self._node_ids[i] for i in path]